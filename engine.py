@@ -1,24 +1,47 @@
+import sys
 import pygame
-from scripts.constants import DISPLAY_SIZE, FPS
+from scripts.constants import DISPLAY_SIZE, FPS, TILE_SIZE
+from scripts.assets import asset_manager
+from scripts.music import music_player, SFX_CHANNELS
 from scripts.game import Game
 from scripts.menu import Menu
 from scripts.GameManager import game_state_manager
 from scripts.editor import EditorMenu
 
+# Decoded on worker threads before the screens are built. Tiles are left out: each level
+# loads only the families its map uses, served from the asset bundle once it has been written.
+# So are the level backgrounds, only the one a level uses is decoded when it loads.
+STARTUP_IMAGES = ['player', 'menugbg.png']
+STARTUP_SOUNDS = ['click', 'death', 'hover', 'jump', 'land', 'level_complete', 'wallcollide'] # music is streamed
+
 class Engine:
-    def __init__(self):
+    def __init__(self, uncapped=False):
+        pygame.mixer.pre_init(buffer=512) # small buffer keeps effects in step with the action
         pygame.init()
+        if pygame.mixer.get_init():
+            pygame.mixer.set_num_channels(SFX_CHANNELS)
 
         pygame.display.set_caption('Super Terboy')
         self.display = pygame.display.set_mode(DISPLAY_SIZE)
         self.clock = pygame.time.Clock()
-        self.game = Game(self.display, self.clock)
+        asset_manager.open_bundle(TILE_SIZE) # pre-scaled images for this resolution
+        asset_manager.preload(STARTUP_IMAGES, STARTUP_SOUNDS, on_progress=self.draw_loading)
+        self.game = Game(self.display, self.clock, uncapped)
         self.editor = EditorMenu(self.display)
         self.menu = Menu(self.display)
+        asset_manager.save_bundle()
 
         self.state = {'game': self.game, 'editor': self.editor, 'menu': self.menu}
 
 
+    def draw_loading(self, done, total):
+        bar = pygame.Rect(DISPLAY_SIZE[0] // 4, DISPLAY_SIZE[1] // 2, DISPLAY_SIZE[0] // 2, max(4, DISPLAY_SIZE[1] // 60))
+        self.display.fill((0, 0, 0))
+        pygame.draw.rect(self.display, (60, 60, 60), bar)
+        pygame.draw.rect(self.display, (255, 255, 255), (bar.x, bar.y, bar.width * done // max(total, 1), bar.height))
+        pygame.event.pump()
+        pygame.display.update()
+
     def run(self):
         previous_state = None
         
@@ -29,13 +52,15 @@ class Engine:
                 self.game.initialize_environment()
             
             self.state[current_state].run()
+            music_player.update()
             
             previous_state = current_state
             
             pygame.display.update()
-            self.clock.tick(FPS)
+            # Menus and the editor always run capped; the game can be switched to uncapped
+            self.clock.tick(0 if current_state == 'game' and self.game.uncapped else FPS)
 
 
 if __name__ == '__main__':
-    Engine().run()
+    Engine(uncapped='--uncapped' in sys.argv).run()
     
\ No newline at end of file
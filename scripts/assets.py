@@ -0,0 +1,289 @@
+# assets.py
+import os
+import json
+import mmap
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pygame
+
+BASE_IMG_PATH = 'data/images/'
+BASE_SFX_PATH = 'data/sfx/'
+
+# Bundle layout (little endian): magic, version, length of the JSON index, the index, then
+# the raw RGB pixels of every image back to back. Index entries carry the source file's
+# mtime and size so an edited PNG is decoded again instead of served stale.
+BUNDLE_FOLDER = os.path.join('data', 'cache')
+BUNDLE_MAGIC = b'TBBDL'
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct('<5sHI')
+
+def bundle_path(name):
+    return os.path.join(BUNDLE_FOLDER, f"assets_{name}.bundle")
+
+def asset_files(base, path, extension):
+    # Files under base + path (a folder, searched recursively, or a single file), relative to base
+    full_path = base + path
+    if os.path.isfile(full_path):
+        return [path]
+    files = []
+    for root, _, names in os.walk(full_path):
+        for name in sorted(names):
+            if name.endswith(extension):
+                files.append(os.path.relpath(os.path.join(root, name), base).replace(os.sep, '/'))
+    return files
+
+def source_stamp(path):
+    try:
+        stat = os.stat(BASE_IMG_PATH + path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+class AssetManager:
+    # Decodes each image file once per process and hands out shared surfaces keyed by
+    # (path, scale, colorkey). Callers must treat the surfaces as read-only.
+    def __init__(self):
+        self.sources = {} # (path, colorkey) -> decoded surface at its file size
+        self.scaled = {} # (path, scale, colorkey) -> surface
+        self.listings = {} # folder -> sorted file names
+        self.sounds = {} # (path, volume) -> list of sounds
+        self.decoded = {} # path -> surface from preload(), waiting for its first image() call
+        self.decoded_sounds = {} # path -> sound from preload(), waiting for its first use
+        self.bundle_name = None
+        self.bundle_scale = None # (tile size, tile size), the only scale the bundle keeps
+        self.bundle_file = None
+        self.bundle_data = None # memory map of the open bundle
+        self.bundle_entries = {} # (path, scale, colorkey) -> index entry
+        self.bundle_dirty = False # images were decoded that the bundle doesn't have yet
+        self.bundle_writer = None # thread of the save_bundle() in progress
+        self.lock = threading.RLock() # guards the dicts and the bundle map, image() runs on worker threads too
+
+    def list_dir(self, folder):
+        if folder not in self.listings:
+            self.listings[folder] = sorted(os.listdir(folder))
+        return self.listings[folder]
+
+    def image(self, path, scale=None, remove_color=(0, 0, 0)):
+        # The lock only covers the dict lookups and inserts. Decoding and scaling run outside it,
+        # so the editor's prewarm thread never holds up the main thread; when two threads build
+        # the same image at once, the first to insert it wins and both get that one.
+        scale = tuple(scale) if scale is not None else None
+        colorkey = tuple(remove_color) if remove_color is not None else None
+        key = (path, scale, colorkey)
+        source_key = (path, colorkey)
+        with self.lock:
+            img = self.scaled.get(key)
+            if img is not None:
+                return img
+            bundled = self.bundled_pixels(key)
+            source = self.sources.get(source_key)
+            decoded = self.decoded.pop(path, None) if source is None and bundled is None else None
+
+        if bundled is not None:
+            img = pygame.image.frombytes(bundled[0], bundled[1], 'RGB').convert()
+            if colorkey is not None: img.set_colorkey(colorkey)
+        else:
+            if source is None:
+                source = decoded if decoded is not None else pygame.image.load(BASE_IMG_PATH + path).convert()
+                if colorkey is not None: source.set_colorkey(colorkey)
+                with self.lock:
+                    source = self.sources.setdefault(source_key, source)
+            img = pygame.transform.scale(source, scale) if scale is not None else source
+
+        with self.lock:
+            if bundled is None and self.bundle_name is not None and scale == self.bundle_scale:
+                self.bundle_dirty = True
+            return self.scaled.setdefault(key, img)
+
+    def bundled_pixels(self, key):
+        # (pixels, size) of a bundled image whose source file is unchanged, copied out of the map
+        entry = self.bundle_entries.get(key)
+        if entry is None or entry['stamp'] != source_stamp(key[0]):
+            return None
+        return self.bundle_data[entry['offset']:entry['offset'] + entry['length']], tuple(entry['size'])
+
+    def open_bundle(self, tile_size):
+        # Serves the tile size images for one resolution from data/cache; a missing or damaged
+        # bundle just means they are decoded from the PNGs and written out on the next save_bundle()
+        self.close_bundle()
+        name = tile_size
+        self.bundle_name = name
+        self.bundle_scale = (tile_size, tile_size)
+        try:
+            self.bundle_file = open(bundle_path(name), 'rb')
+            self.bundle_data = mmap.mmap(self.bundle_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, index_length = BUNDLE_HEADER.unpack_from(self.bundle_data, 0)
+            if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+                raise ValueError(f"{bundle_path(name)} is not a version {BUNDLE_VERSION} asset bundle")
+            index = json.loads(self.bundle_data[BUNDLE_HEADER.size:BUNDLE_HEADER.size + index_length].decode('utf-8'))
+            data_start = BUNDLE_HEADER.size + index_length
+            for entry in index:
+                entry['offset'] += data_start
+                scale = tuple(entry['scale']) if entry['scale'] is not None else None
+                colorkey = tuple(entry['colorkey']) if entry['colorkey'] is not None else None
+                self.bundle_entries[(entry['path'], scale, colorkey)] = entry
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            self.close_bundle()
+            self.bundle_name = name
+            self.bundle_scale = (tile_size, tile_size)
+
+    def close_bundle(self):
+        if self.bundle_data is not None:
+            self.bundle_data.close()
+            self.bundle_data = None
+        if self.bundle_file is not None:
+            self.bundle_file.close()
+            self.bundle_file = None
+        self.bundle_entries = {}
+        self.bundle_name = None
+        self.bundle_scale = None
+
+    def save_bundle(self):
+        # Writes the images at the bundle's tile size, if any of them had to be decoded from disk.
+        # Backgrounds and the editor's zoom levels are left out, they would make the file many
+        # times larger for little gain. The pixels are copied here, since a surface can't be
+        # blitted while another thread reads it, and the file is written on a worker thread.
+        # That thread isn't a daemon, so quitting still finishes the file.
+        with self.lock:
+            if self.bundle_name is None or not self.bundle_dirty:
+                return
+            if self.bundle_writer is not None and self.bundle_writer.is_alive():
+                return # stays dirty, the next call writes what this one missed
+            self.bundle_dirty = False
+            name = self.bundle_name
+            images = [(key, img) for key, img in self.scaled.items() if key[1] == self.bundle_scale]
+            # Entries this session never loaded, like other maps' tile families, carry over
+            kept = {key for key, _ in images}
+            entries = [(key, entry['stamp'], entry['size'], self.bundle_data[entry['offset']:entry['offset'] + entry['length']])
+                       for key, entry in self.bundle_entries.items() if key not in kept]
+        entries += [(key, source_stamp(key[0]), img.get_size(), pygame.image.tobytes(img, 'RGB')) for key, img in images]
+        self.bundle_writer = threading.Thread(target=self.write_bundle, args=(name, entries))
+        self.bundle_writer.start()
+
+    def write_bundle(self, name, entries):
+        index = []
+        chunks = []
+        offset = 0
+        for (path, scale, colorkey), stamp, size, pixels in entries:
+            if stamp is None or stamp != source_stamp(path):
+                continue
+            index.append({'path': path, 'scale': scale, 'colorkey': colorkey, 'stamp': stamp,
+                          'size': size, 'offset': offset, 'length': len(pixels)})
+            chunks.append(pixels)
+            offset += len(pixels)
+        index_data = json.dumps(index).encode('utf-8')
+
+        path = bundle_path(name)
+        temp_path = path + '.tmp'
+        try:
+            os.makedirs(BUNDLE_FOLDER, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(index_data)))
+                f.write(index_data)
+                for pixels in chunks:
+                    f.write(pixels)
+        except OSError as e:
+            print(f"Error saving asset bundle: {e}")
+            return
+        with self.lock:
+            if self.bundle_name != name:
+                return # another bundle was opened in the meantime
+            self.close_bundle() # the old file must not be mapped while it is replaced
+            try:
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"Error saving asset bundle: {e}")
+            self.open_bundle(name)
+
+    def preload(self, image_paths=(), sound_paths=(), on_progress=None, workers=None):
+        # Decodes image and sound files on a thread pool. convert() needs the display, so it runs
+        # here on the calling thread as each image arrives; on_progress(done, total) is called
+        # after every file. Files that fail to decode are left for image()/sound() to report.
+        bundled = {key[0]: entry['stamp'] for key, entry in self.bundle_entries.items()}
+        sourced = {key[0] for key in self.sources}
+        image_files = [path for folder in image_paths for path in asset_files(BASE_IMG_PATH, folder, '.png')
+                       if path not in self.decoded and path not in sourced and bundled.get(path) != source_stamp(path)]
+        sound_files = [path for folder in sound_paths for path in asset_files(BASE_SFX_PATH, folder, '.mp3')
+                       if path not in self.decoded_sounds]
+        total = len(image_files) + len(sound_files)
+        done = 0
+        if on_progress: on_progress(done, total)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(pygame.image.load, BASE_IMG_PATH + path): (self.decoded, path) for path in image_files}
+            futures.update({pool.submit(pygame.mixer.Sound, BASE_SFX_PATH + path): (self.decoded_sounds, path) for path in sound_files})
+            for future in as_completed(futures):
+                store, path = futures[future]
+                try:
+                    result = future.result()
+                    store[path] = result.convert() if store is self.decoded else result
+                except (pygame.error, OSError):
+                    pass
+                done += 1
+                if on_progress: on_progress(done, total)
+
+    def images(self, path, scale=None, remove_color=(0, 0, 0)):
+        return [self.image(path + '/' + img_name, scale, remove_color) for img_name in self.list_dir(BASE_IMG_PATH + path)]
+
+    def sound_list(self, path, volume=0.05):
+        key = (path, volume)
+        if key not in self.sounds:
+            sounds = []
+            full_path = BASE_SFX_PATH + path
+            for snd_name in self.list_dir(full_path):
+                if snd_name.endswith('.mp3'):
+                    sounds.append(self.sound(path + '/' + snd_name, volume))
+            self.sounds[key] = sounds
+        return list(self.sounds[key])
+
+    def sound(self, path, volume=None):
+        # A new Sound per call, so volumes stay independent; a preloaded one is used up first
+        if path in self.decoded_sounds:
+            sound = self.decoded_sounds.pop(path)
+        else:
+            sound = pygame.mixer.Sound(BASE_SFX_PATH + path)
+        if volume is not None:
+            sound.set_volume(volume)
+        return sound
+
+    def evict(self, scale=None, prefix=''):
+        # Drops scaled copies (all of them, or only those at one size) of the images whose
+        # path starts with prefix; decoded files stay, so rebuilding needs no disk access
+        with self.lock:
+            scale = tuple(scale) if scale is not None else None
+            for key in [key for key in self.scaled if key[1] is not None and (scale is None or key[1] == scale)
+                        and key[0].startswith(prefix)]:
+                del self.scaled[key]
+
+    def clear(self):
+        self.close_bundle()
+        self.bundle_dirty = False
+        self.sources.clear()
+        self.scaled.clear()
+        self.listings.clear()
+        self.sounds.clear()
+        self.decoded.clear()
+        self.decoded_sounds.clear()
+
+asset_manager = AssetManager()
+
+TILE_FAMILIES = ['decor', 'grass', 'stone', 'spawners', 'spikes', 'finish', 'ores', 'weather', 'kill',
+                 'nether', 'wood', 'wool', 'saws']
+
+class TileAssets(dict):
+    # Asset dict whose tile families load on first lookup, so a level only holds the families
+    # its map uses and anything else still works, just with a load on first use
+    def __init__(self, scale, assets=()):
+        super().__init__(assets)
+        self.scale = scale
+
+    def __missing__(self, key):
+        if key not in TILE_FAMILIES:
+            raise KeyError(key)
+        self[key] = asset_manager.images('tiles/' + key, scale=self.scale)
+        return self[key]
+
+    def load(self, tile_types):
+        for tile_type in tile_types:
+            if tile_type in TILE_FAMILIES:
+                self[tile_type]
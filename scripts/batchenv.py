@@ -0,0 +1,285 @@
+# batchenv.py
+# Steps many independent players on one map in a single call, for AI training. Every agent
+# follows the rules of PlayerBody.step and Simulation.step exactly; the loops over the nine
+# neighbouring tiles run once per offset for all agents at a time as NumPy array operations.
+# PlayerBody.sweep is not mirrored: stock PhysicsConstants never move a player its own size
+# in one tick, which is all BatchEnvironment builds with.
+# Needs numpy, which the game itself does not.
+import numpy as np
+from scripts.physics import BASE_TILE_SIZE, PLAYER_BUFFER, COYOTE_TIME, WALL_MOMENTUM_PRESERVE, WALL_MOMENTUM_FRAMES, PhysicsConstants
+from scripts.tileworld import NEIGHBOR_OFFSETS, PHYSICS_TYPE_IDS
+from scripts.tilegrid import TYPE_MASK
+from scripts.simulation import DEATH_FRAMES, load_level, player_size
+
+DEADLY = 1
+FINISH = 2
+
+# Action columns
+LEFT, RIGHT, JUMP = 0, 1, 2
+# Collision columns, in the order of PlayerBody.collisions
+UP, DOWN, COLLIDE_RIGHT, COLLIDE_LEFT = 0, 1, 2, 3
+
+# Observation layout: x, y, x velocity, y velocity, grounded, the four collision flags, then
+# solid, deadly and finish flags for the 3x3 tiles around the player in NEIGHBOR_OFFSETS order
+OBS_SIZE = 9 + 3 * len(NEIGHBOR_OFFSETS)
+
+FINISH_REWARD = 1.0
+DEATH_REWARD = -1.0
+
+class BatchEnvironment:
+    def __init__(self, map_path, num_agents, tile_size=BASE_TILE_SIZE, auto_reset=True):
+        self.map_path = map_path
+        self.num_agents = num_agents
+        self.tile_size = tile_size
+        self.auto_reset = auto_reset # reset agents at the start of the step after they report done
+        self.physics = PhysicsConstants(tile_size)
+        self.tilemap, self.default_pos = load_level(map_path, tile_size)
+        size = player_size(self.physics)
+        self.width, self.height = int(size[0]), int(size[1])
+        self.below_y = self.tilemap.lowest_y * tile_size + 2 * tile_size
+        self.build_grids()
+
+        n = num_agents
+        self.pos = np.zeros((n, 2))
+        self.velocity = np.zeros((n, 2))
+        self.collisions = np.zeros((n, 4), dtype=bool)
+        self.air_time = np.zeros(n, dtype=np.int64)
+        self.grounded = np.zeros(n, dtype=bool)
+        self.facing_right = np.zeros(n, dtype=bool)
+        self.jump_available = np.zeros(n, dtype=bool)
+        self.coyote_time = np.zeros(n, dtype=np.int64)
+        self.death = np.zeros(n, dtype=bool)
+        self.finish = np.zeros(n, dtype=bool)
+        self.was_colliding_wall = np.zeros(n, dtype=bool)
+        self.wall_contact_time = np.zeros(n, dtype=np.int64)
+        self.wall_momentum_active = np.zeros(n, dtype=bool)
+        self.countdeathframes = np.zeros(n, dtype=np.int64)
+        self.jump_buffer = np.zeros(n, dtype=np.int64)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+        self.reset()
+
+    def build_grids(self):
+        # Dense copies of the grid: a solid flag, a hazard kind and a hazard box per cell
+        tiles = list(self.tilemap.tilemap.iter_codes())
+        xs = [x for x, _, _ in tiles] or [0]
+        ys = [y for _, y, _ in tiles] or [0]
+        self.origin = (min(xs), min(ys))
+        self.grid_size = (max(xs) - min(xs) + 1, max(ys) - min(ys) + 1)
+        cells = self.grid_size[0] * self.grid_size[1]
+        self.solid = np.zeros(cells, dtype=bool)
+        self.hazard_kind = np.zeros(cells, dtype=np.int8)
+        self.hazard_box = np.zeros((cells, 4), dtype=np.int64)
+        for x, y, code in tiles:
+            i = (y - self.origin[1]) * self.grid_size[0] + (x - self.origin[0])
+            if (code & TYPE_MASK) in PHYSICS_TYPE_IDS:
+                self.solid[i] = True
+            hazard = self.tilemap.interactive_box(x, y, code)
+            if hazard:
+                box, tile_info = hazard
+                self.hazard_kind[i] = FINISH if tile_info[0] == 'finish' else DEADLY
+                self.hazard_box[i] = box
+        # Off-grid hazards are all deadly and rare, so every agent is tested against each of them
+        offgrid = [self.tilemap.offgrid_hazard(tile) for tile in self.tilemap.offgrid_tiles]
+        self.offgrid_boxes = np.array([hazard[0] for hazard in offgrid if hazard], dtype=np.int64).reshape(-1, 4)
+
+    def cells_at(self, tile_x, tile_y):
+        # Flat cell indices and a mask of which tiles fall inside the grid
+        grid_x = tile_x - self.origin[0]
+        grid_y = tile_y - self.origin[1]
+        inside = (grid_x >= 0) & (grid_x < self.grid_size[0]) & (grid_y >= 0) & (grid_y < self.grid_size[1])
+        return np.where(inside, grid_y * self.grid_size[0] + grid_x, 0), inside
+
+    def tiles_of(self):
+        tile = np.floor_divide(self.pos, self.tile_size).astype(np.int64)
+        return tile[:, 0], tile[:, 1]
+
+    def reset(self, mask=None):
+        mask = np.ones(self.num_agents, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        self.respawn(mask)
+        self.ticks[mask] = 0
+        self.done[mask] = False
+        return self.observe()
+
+    def respawn(self, mask):
+        # Same state Simulation.respawn restores
+        self.pos[mask] = self.default_pos
+        self.velocity[mask] = 0
+        self.collisions[mask] = False
+        self.air_time[mask] = 5
+        self.grounded[mask] = False
+        self.facing_right[mask] = True
+        self.jump_available[mask] = True
+        self.coyote_time[mask] = 0
+        self.death[mask] = False
+        self.finish[mask] = False
+        self.was_colliding_wall[mask] = False
+        self.wall_contact_time[mask] = 0
+        self.wall_momentum_active[mask] = False
+        self.countdeathframes[mask] = 0
+        self.jump_buffer[mask] = 0
+
+    def step(self, actions):
+        # actions is an (num_agents, 3) array of left, right, jump; returns observations, rewards, dones
+        actions = np.asarray(actions, dtype=bool).reshape(self.num_agents, 3)
+        left, right, jump = actions[:, LEFT].copy(), actions[:, RIGHT].copy(), actions[:, JUMP].copy()
+        if self.auto_reset and self.done.any():
+            self.reset(self.done)
+
+        self.jump_buffer = np.where(jump, np.minimum(self.jump_buffer + 1, PLAYER_BUFFER + 1), 0)
+
+        self.countdeathframes += self.death
+        respawn = self.death & (self.countdeathframes >= DEATH_FRAMES)
+        if respawn.any():
+            self.respawn(respawn)
+            left &= ~respawn
+            right &= ~respawn
+            jump &= ~respawn
+
+        was_dead = self.death.copy()
+        was_finished = self.finish.copy()
+        self.step_bodies(~self.finish, left, right, jump)
+        self.ticks += 1
+
+        died = self.death & ~was_dead
+        finished = self.finish & ~was_finished
+        rewards = np.where(finished, FINISH_REWARD, 0.0) + np.where(died, DEATH_REWARD, 0.0)
+        self.done = died | finished
+        return self.observe(), rewards, self.done.copy()
+
+    def step_bodies(self, active, left, right, jump):
+        physics = self.physics
+        tile_size = self.tile_size
+        width, height = self.width, self.height
+        pos, velocity, collisions = self.pos, self.velocity, self.collisions
+
+        below = active & (pos[:, 1] > self.below_y)
+        self.death |= below
+        velocity[below] = 0
+        active = active & ~below & (self.countdeathframes <= DEATH_FRAMES)
+
+        collisions[active] = False
+        alive = active & ~self.death
+        move = right.astype(np.int64) - left.astype(np.int64)
+        x_acceleration = np.where(move == 0, 1 - physics.decceleration, 1 - physics.acceleration)
+        velocity_x = np.clip((velocity[:, 0] + move * physics.player_speed) * x_acceleration, -physics.max_x_speed, physics.max_x_speed)
+        gravity = np.where((velocity[:, 1] > 0) & ~jump, physics.gravity_down, physics.gravity_up)
+        velocity_y = np.clip(velocity[:, 1] + gravity, -physics.max_y_speed, physics.max_y_speed)
+        velocity[:, 0] = np.where(alive, velocity_x, np.where(active, 0.0, velocity[:, 0]))
+        velocity[:, 1] = np.where(alive, velocity_y, np.where(active, 0.0, velocity[:, 1]))
+
+        # X pass, then Y pass, resolving against each neighbour in turn like PlayerBody.step
+        pos[:, 0] = np.where(active, pos[:, 0] + velocity[:, 0], pos[:, 0])
+        entity_x, entity_y = np.trunc(pos[:, 0]).astype(np.int64), np.trunc(pos[:, 1]).astype(np.int64)
+        tile_x, tile_y = self.tiles_of()
+        for dx, dy in NEIGHBOR_OFFSETS:
+            cells, inside = self.cells_at(tile_x + dx, tile_y + dy)
+            box_x, box_y = (tile_x + dx) * tile_size, (tile_y + dy) * tile_size
+            hit = (active & inside & self.solid[cells] & (entity_x < box_x + tile_size) & (entity_y < box_y + tile_size)
+                   & (entity_x + width > box_x) & (entity_y + height > box_y))
+            hit_right = hit & (velocity[:, 0] > 0)
+            hit_left = hit & (velocity[:, 0] < 0)
+            entity_x = np.where(hit_right, box_x - width, np.where(hit_left, box_x + tile_size, entity_x))
+            collisions[:, COLLIDE_RIGHT] |= hit_right
+            collisions[:, COLLIDE_LEFT] |= hit_left
+            pos[:, 0] = np.where(hit, entity_x, pos[:, 0])
+
+        pos[:, 1] = np.where(active, pos[:, 1] + velocity[:, 1], pos[:, 1])
+        entity_x, entity_y = np.trunc(pos[:, 0]).astype(np.int64), np.trunc(pos[:, 1]).astype(np.int64)
+        tile_x, tile_y = self.tiles_of()
+        for dx, dy in NEIGHBOR_OFFSETS:
+            cells, inside = self.cells_at(tile_x + dx, tile_y + dy)
+            box_x, box_y = (tile_x + dx) * tile_size, (tile_y + dy) * tile_size
+            hit = (active & inside & self.solid[cells] & (entity_x < box_x + tile_size) & (entity_y < box_y + tile_size)
+                   & (entity_x + width > box_x) & (entity_y + height > box_y))
+            hit_down = hit & (velocity[:, 1] > 0)
+            hit_up = hit & (velocity[:, 1] < 0)
+            entity_y = np.where(hit_down, box_y - height, np.where(hit_up, box_y + tile_size, entity_y))
+            collisions[:, DOWN] |= hit_down
+            collisions[:, UP] |= hit_up
+            pos[:, 1] = np.where(hit, entity_y, pos[:, 1])
+
+        # Hazards: the first deadly tile ends the step, finish tiles only set the flag
+        entity_x, entity_y = np.trunc(pos[:, 0]).astype(np.int64), np.trunc(pos[:, 1]).astype(np.int64)
+        tile_x, tile_y = self.tiles_of()
+        for dx, dy in NEIGHBOR_OFFSETS:
+            cells, inside = self.cells_at(tile_x + dx, tile_y + dy)
+            kind = np.where(inside, self.hazard_kind[cells], 0)
+            box = self.hazard_box[cells]
+            hit = (active & (kind > 0) & (entity_x < box[:, 0] + box[:, 2]) & (entity_y < box[:, 1] + box[:, 3])
+                   & (entity_x + width > box[:, 0]) & (entity_y + height > box[:, 1]))
+            killed = hit & (kind == DEADLY)
+            self.finish |= hit & (kind == FINISH)
+            self.death |= killed
+            velocity[killed] = 0
+            active = active & ~killed
+        if len(self.offgrid_boxes):
+            box = self.offgrid_boxes
+            killed = active & ((entity_x[:, None] < box[:, 0] + box[:, 2]) & (entity_y[:, None] < box[:, 1] + box[:, 3])
+                               & (entity_x[:, None] + width > box[:, 0]) & (entity_y[:, None] + height > box[:, 1])).any(axis=1)
+            self.death |= killed
+            velocity[killed] = 0
+            active = active & ~killed
+
+        facing = active & (right != left)
+        self.facing_right = np.where(facing, right, self.facing_right)
+
+        hit_wall = collisions[:, COLLIDE_LEFT] | collisions[:, COLLIDE_RIGHT]
+        velocity[:, 0] = np.where(active & hit_wall, 0.0, velocity[:, 0])
+        velocity[:, 1] = np.where(active & (collisions[:, DOWN] | collisions[:, UP]), 0.0, velocity[:, 1])
+        self.was_colliding_wall = np.where(active, hit_wall, self.was_colliding_wall)
+
+        # Air time, grounded state and coyote time
+        was_grounded = self.grounded.copy()
+        landed = active & collisions[:, DOWN]
+        self.air_time = np.where(landed, 0, np.where(active, self.air_time + 1, self.air_time))
+        self.coyote_time = np.where(landed, 0, self.coyote_time)
+        self.grounded = np.where(active, self.air_time <= 4, self.grounded)
+        left_ground = active & was_grounded & ~self.grounded
+        in_air = active & ~self.grounded & ~left_ground
+        self.coyote_time = np.where(left_ground, 0, np.where(in_air, self.coyote_time + 1, self.coyote_time))
+
+        # Jumps
+        pressed = active & jump & self.jump_available
+        self.jump_available = np.where(active & ~jump, True, np.where(pressed, False, self.jump_available))
+        wall_jump = pressed & ~self.grounded & hit_wall
+        velocity[:, 1] = np.where(wall_jump, -physics.walljump_y_speed, velocity[:, 1])
+        velocity[:, 0] = np.where(wall_jump & collisions[:, COLLIDE_RIGHT], -physics.walljump_x_speed, velocity[:, 0])
+        velocity[:, 0] = np.where(wall_jump & collisions[:, COLLIDE_LEFT], physics.walljump_x_speed, velocity[:, 0])
+        can_coyote_jump = (self.coyote_time <= COYOTE_TIME) & ~self.grounded
+        ground_jump = pressed & ~wall_jump & (self.grounded | can_coyote_jump) & (self.jump_buffer <= PLAYER_BUFFER)
+        velocity[:, 1] = np.where(ground_jump, -physics.jump_speed, velocity[:, 1])
+        self.air_time = np.where(ground_jump, 5, self.air_time)
+        self.grounded = self.grounded & ~ground_jump
+        self.coyote_time = np.where(ground_jump, COYOTE_TIME + 1, self.coyote_time)
+
+        # Wall slide and wall slide momentum
+        sliding = active & ~self.grounded & hit_wall
+        first_contact = sliding & ~self.was_colliding_wall
+        self.wall_contact_time = np.where(first_contact, 0, self.wall_contact_time)
+        self.wall_momentum_active |= first_contact & (velocity[:, 1] < 0)
+        self.wall_contact_time = np.where(sliding, self.wall_contact_time + 1, self.wall_contact_time)
+        keep_momentum = sliding & self.wall_momentum_active & (self.wall_contact_time <= WALL_MOMENTUM_FRAMES)
+        velocity[:, 1] = np.where(keep_momentum, velocity[:, 1] * WALL_MOMENTUM_PRESERVE, velocity[:, 1])
+        slowing = sliding & ~keep_momentum
+        self.wall_momentum_active &= ~slowing
+        velocity[:, 1] = np.where(slowing & (velocity[:, 1] > 0), np.minimum(physics.wallslide_speed, velocity[:, 1]), velocity[:, 1])
+
+        # Cut jump short if key released
+        velocity[:, 1] = np.where(active & ~jump & (velocity[:, 1] < 0), 0.0, velocity[:, 1])
+
+    def observe(self):
+        obs = np.empty((self.num_agents, OBS_SIZE), dtype=np.float32)
+        obs[:, 0:2] = self.pos
+        obs[:, 2:4] = self.velocity
+        obs[:, 4] = self.grounded
+        obs[:, 5:9] = self.collisions
+        tile_x, tile_y = self.tiles_of()
+        count = len(NEIGHBOR_OFFSETS)
+        for i, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+            cells, inside = self.cells_at(tile_x + dx, tile_y + dy)
+            kind = np.where(inside, self.hazard_kind[cells], 0)
+            obs[:, 9 + i] = inside & self.solid[cells]
+            obs[:, 9 + count + i] = kind == DEADLY
+            obs[:, 9 + 2 * count + i] = kind == FINISH
+        return obs
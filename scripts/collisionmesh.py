@@ -0,0 +1,91 @@
+# collisionmesh.py
+# Solid tiles merged into rectangles, so collision queries get a few prebuilt boxes
+from scripts.physics import PHYSICS_TILES
+from scripts.tilegrid import TYPE_MASK, type_id, pack_key, unpack_key, key_offset, box_keys
+
+PHYSICS_TYPE_IDS = {type_id(tile_type) for tile_type in PHYSICS_TILES}
+NEIGHBOR_OFFSETS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (0, 0), (-1, 1), (0, 1), (1, 1)]
+NEIGHBOR_KEY_OFFSETS = [key_offset(*offset) for offset in NEIGHBOR_OFFSETS]
+
+class CollisionMesh:
+    # Each chunk's solid tiles are greedily merged into maximal rectangles (rows first, then
+    # downwards), so an edit only remeshes its own chunk. For every tile cell next to a solid
+    # tile, around[key] is the tuple of merged boxes touching its 3x3 neighbourhood, in the
+    # same neighbour order the per-tile query used. Boxes are (x, y, width, height) in pixels.
+    def __init__(self, world, chunk_size):
+        self.world = world
+        self.chunk_size = chunk_size
+        self.tile_size = world.tile_size
+        self.chunk_rects = {} # chunk -> merged rects as (x, y, width, height) in tiles
+        self.owner = {} # key of a solid tile -> pixel box of the rect covering it
+        self.around = {} # key -> tuple of boxes for the 3x3 tiles around it
+        for chunk in world.chunks:
+            self.mesh_chunk(chunk)
+        self.update_around(set(key + offset for key in self.owner for offset in NEIGHBOR_KEY_OFFSETS))
+
+    def mesh_chunk(self, chunk):
+        for x, y, width, height in self.chunk_rects.pop(chunk, ()):
+            for ty in range(y, y + height):
+                for tx in range(x, x + width):
+                    del self.owner[pack_key(tx, ty)]
+
+        cells = self.world.tilemap.cells
+        solid = set()
+        for key in self.world.chunks.get(chunk, ()):
+            if (cells[key] & TYPE_MASK) in PHYSICS_TYPE_IDS:
+                solid.add(unpack_key(key))
+        if not solid:
+            return
+
+        rects = []
+        ts = self.tile_size
+        for y, x in sorted((y, x) for x, y in solid):
+            if (x, y) not in solid:
+                continue # already part of an earlier rect
+            width = 1
+            while (x + width, y) in solid:
+                width += 1
+            height = 1
+            while all((tx, y + height) in solid for tx in range(x, x + width)):
+                height += 1
+            box = (x * ts, y * ts, width * ts, height * ts)
+            for ty in range(y, y + height):
+                for tx in range(x, x + width):
+                    solid.discard((tx, ty))
+                    self.owner[pack_key(tx, ty)] = box
+            rects.append((x, y, width, height))
+        self.chunk_rects[chunk] = rects
+
+    def update_around(self, keys):
+        owner = self.owner
+        for key in keys:
+            boxes = []
+            for offset in NEIGHBOR_KEY_OFFSETS:
+                box = owner.get(key + offset)
+                if box is not None and box not in boxes:
+                    boxes.append(box)
+            if boxes:
+                self.around[key] = tuple(boxes)
+            else:
+                self.around.pop(key, None)
+
+    def update_chunk(self, chunk):
+        # After an edit: remesh the chunk, then refresh every cell whose neighbourhood reaches
+        # into it. Rects never cross chunk edges, so that is the chunk plus a one tile border.
+        self.mesh_chunk(chunk)
+        size = self.chunk_size
+        start_x, start_y = chunk[0] * size - 1, chunk[1] * size - 1
+        self.update_around(pack_key(x, y) for y in range(start_y, start_y + size + 2) for x in range(start_x, start_x + size + 2))
+
+    def boxes_around(self, key):
+        return self.around.get(key, ())
+
+    def boxes_in(self, area):
+        # Merged boxes overlapping a pixel box of any size. A merged box covers whole cells,
+        # so owning an overlapped cell means overlapping the area.
+        boxes = []
+        for key in box_keys(area, self.tile_size):
+            box = self.owner.get(key)
+            if box is not None and box not in boxes:
+                boxes.append(box)
+        return boxes
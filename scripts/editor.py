@@ -3,9 +3,17 @@ import pygame
 import os
 import random
 import json
+import threading
+import queue
+import weakref
+from collections import OrderedDict
 from scripts.utils import load_images, load_image, find_next_numeric_filename, MenuScreen, load_sounds, TextInput, render_text_with_shadow
+from scripts.assets import asset_manager
 from scripts.tilemap import Tilemap
-from scripts.constants import TILE_SIZE, DISPLAY_SIZE, FPS, PHYSICS_TILES, FONT, MENUBG, calculate_ui_constants
+from scripts.overview import Overview, lod_tile_size
+from scripts.tilegrid import pack_tile
+from scripts.sprites import SpriteTable
+from scripts.constants import TILE_SIZE, DISPLAY_SIZE, FPS, PHYSICS_TILES, FONT, calculate_ui_constants
 from scripts.GameManager import game_state_manager
 
 class EditorMenu:
@@ -13,10 +21,7 @@ class EditorMenu:
         self.screen = display
         self.sfx = {'click': load_sounds('click')}
         
-        self.background = pygame.transform.scale(
-            pygame.image.load(MENUBG).convert(), 
-            DISPLAY_SIZE
-        )
+        self.background = load_image('menugbg.png', scale=DISPLAY_SIZE, remove_color=None)
         
         self.UI_CONSTANTS = calculate_ui_constants(DISPLAY_SIZE)
         self.selected_map = None
@@ -433,6 +438,95 @@ class EditorMapSelectionScreen(MenuScreen):
         render_text_with_shadow(surface, current_difficulty.upper(), self.fonts['detail'], diff_color,
                                right_x, DISPLAY_SIZE[1] * 0.48, shadow_offset, True)
 
+EDITOR_TILE_TYPES = ['decor', 'grass', 'stone', 'spawners', 'spikes', 'finish', 'ores', 'weather', 'kill', 'nether', 'wood', 'wool']
+ZOOM_CACHE_LEVELS = 5
+
+def zoom_tile_size(zoom):
+    return int(TILE_SIZE * zoom // 10)
+
+class ZoomPyramid:
+    # Tile sets for each zoom level, scaled from the decoded originals the asset manager
+    # keeps in memory. The most recently used levels stay cached, and prewarm() has one
+    # worker thread build neighbouring levels so stepping the zoom does not stall. Levels
+    # are built outside the lock and only published under it. Editors share zoom_pyramid
+    # below, so reopening the editor reuses both the cached levels and the worker.
+    def __init__(self, max_levels=ZOOM_CACHE_LEVELS):
+        self.max_levels = max_levels
+        self.levels = OrderedDict() # tile size -> (assets, sprite table)
+        self.lock = threading.Lock()
+        self.building = {} # tile size -> Event set once the build in progress is done
+        self.requests = queue.Queue()
+        self.worker = None
+
+    def build(self, tile_size):
+        scale = (tile_size, tile_size)
+        assets = {tile_type: load_images('tiles/' + tile_type, scale=scale) for tile_type in EDITOR_TILE_TYPES}
+        return assets, SpriteTable(assets, tile_size)
+
+    def publish(self, tile_size, level):
+        # Keeps a level someone else published first, so both callers share one
+        with self.lock:
+            self.levels.setdefault(tile_size, level)
+            self.levels.move_to_end(tile_size)
+            while len(self.levels) > self.max_levels:
+                old_size, _ = self.levels.popitem(last=False)
+                # The game also draws at TILE_SIZE, so keep those scaled copies around
+                if old_size != TILE_SIZE:
+                    asset_manager.evict((old_size, old_size), prefix='tiles/')
+            return self.levels[tile_size]
+
+    def ensure(self, tile_size):
+        # Builds a level unless it is cached. If another thread is already building it, waits
+        # for that instead: two builds of one size would blit the same scaled surfaces at once.
+        while True:
+            with self.lock:
+                if tile_size in self.levels:
+                    return self.levels[tile_size]
+                building = self.building.get(tile_size)
+                if building is None:
+                    building = self.building[tile_size] = threading.Event()
+                    break
+            building.wait()
+        try:
+            return self.publish(tile_size, self.build(tile_size))
+        finally:
+            with self.lock:
+                del self.building[tile_size]
+            building.set()
+
+    def get(self, tile_size):
+        return self.publish(tile_size, self.ensure(tile_size))
+
+    def prewarm(self, tile_sizes):
+        if self.worker is None:
+            self.worker = threading.Thread(target=prewarm_worker, args=(weakref.ref(self), self.requests), daemon=True)
+            self.worker.start()
+        self.requests.put(list(tile_sizes))
+
+    def close(self):
+        if self.worker is not None:
+            self.requests.put(None)
+            self.worker = None
+
+    def __del__(self):
+        self.close()
+
+def prewarm_worker(pyramid_ref, requests):
+    # Only holds the pyramid while building, so a dropped pyramid stops its worker too
+    while True:
+        tile_sizes = requests.get()
+        # Only the latest request matters when the zoom moved on in the meantime
+        while tile_sizes is not None and not requests.empty():
+            tile_sizes = requests.get()
+        pyramid = pyramid_ref()
+        if tile_sizes is None or pyramid is None:
+            return
+        for tile_size in tile_sizes:
+            pyramid.ensure(tile_size)
+        del pyramid
+
+zoom_pyramid = ZoomPyramid()
+
 class Editor:
     def __init__(self, menu, map_file=None):
         self.menu = menu
@@ -442,13 +536,13 @@ class Editor:
         self.clock = pygame.time.Clock()
         
         self.zoom = 10
-        self.tilemap = Tilemap(self, tile_size=TILE_SIZE)
+        self.tilemap = Tilemap(self, tile_size=TILE_SIZE, bake_chunks=True, overview=Overview(lod_tile_size(DISPLAY_SIZE[0])))
         self.scroll = [0, 0]
         self.current_map_file = map_file
         
+        self.zoom_levels = zoom_pyramid
         self.assets = self.reload_assets()
         self.background_image = load_image('background/background.png', scale=DISPLAY_SIZE)
-        self.rotated_assets = {}
         
         # Menu system
         self.menu_width = 170
@@ -459,7 +553,9 @@ class Editor:
         self.current_rotation = 0
         self.ongrid = True
         
+        # Thumbnails are scaled down to 24px anyway, so they are built once, not per zoom level
         self.tile_type_thumbs = self.generate_tile_type_thumbs()
+        self.prewarm_zoom()
         
         # Input states - simplified
         self.movement = [False] * 4
@@ -501,36 +597,19 @@ class Editor:
         return thumbs
 
     def get_rotated_image(self, tile_type, variant, rotation):
-        key = f"{tile_type}_{variant}_{rotation}"
-        
-        if key not in self.rotated_assets:
-            original = self.assets[tile_type][variant]
-            self.rotated_assets[key] = pygame.transform.rotate(original, rotation)
-        
-        return self.rotated_assets[key]
+        return self.sprites.image(tile_type, variant, rotation)
     
     def reload_assets(self):
-        IMGscale = (self.tilemap.tile_size, self.tilemap.tile_size)
-        assets = {
-            'decor': load_images('tiles/decor', scale=IMGscale),
-            'grass': load_images('tiles/grass', scale=IMGscale),
-            'stone': load_images('tiles/stone', scale=IMGscale),
-            'spawners': load_images('tiles/spawners', scale=IMGscale),
-            'spikes': load_images('tiles/spikes', scale=IMGscale),
-            'finish': load_images('tiles/finish', scale=IMGscale),
-            'ores': load_images('tiles/ores', scale=IMGscale),
-            'weather': load_images('tiles/weather', scale=IMGscale),
-            'kill': load_images('tiles/kill', scale=IMGscale),
-            'nether': load_images('tiles/nether', scale=IMGscale),
-            'wood': load_images('tiles/wood', scale=IMGscale),
-            'wool': load_images('tiles/wool', scale=IMGscale),
-        }
-        self.rotated_assets = {}
+        assets, self.sprites = self.zoom_levels.get(self.tilemap.tile_size)
         return assets
+
+    def prewarm_zoom(self):
+        # Build the levels one step in and out ahead of the next key press
+        self.zoom_levels.prewarm([zoom_tile_size(zoom) for zoom in (self.zoom + 1, self.zoom - 1) if 1 <= zoom <= 20])
     
     def setZoom(self, zoom):
         self.zoom = int(zoom)
-        new_tile_size = int(TILE_SIZE * self.zoom // 10)
+        new_tile_size = zoom_tile_size(self.zoom)
         
         # Simplified zoom calculation
         center_offset_x = DISPLAY_SIZE[0] // 2
@@ -543,19 +622,17 @@ class Editor:
         
         self.tilemap.tile_size = new_tile_size
         self.assets = self.reload_assets()
-        self.tile_type_thumbs = self.generate_tile_type_thumbs()
+        self.prewarm_zoom()
     
     def count_spawners(self):
         return len(self.tilemap.extract([('spawners', 0), ('spawners', 1)], keep=True))
     
     def rotate_spike_at_position(self, pos):
-        tile_loc = f"{pos[0]};{pos[1]}"
-        if tile_loc in self.tilemap.tilemap:
-            tile = self.tilemap.tilemap[tile_loc]
-            if tile['type'] == 'spikes':
-                current_rot = tile.get('rotation', 0)
-                new_rot = (current_rot - 90) % 360
-                self.tilemap.tilemap[tile_loc]['rotation'] = new_rot
+        tile = self.tilemap.tile_at(pos)
+        if tile and tile['type'] == 'spikes':
+            current_rot = tile.get('rotation', 0)
+            tile['rotation'] = (current_rot - 90) % 360
+            self.tilemap.add_tile(tile)
     
     def handle_tile_placement(self, tile_pos, mpos):
         if not self.clicking:
@@ -578,9 +655,9 @@ class Editor:
             tile_data['rotation'] = self.current_rotation
         
         if self.ongrid:
-            self.tilemap.tilemap[f"{tile_pos[0]};{tile_pos[1]}"] = tile_data
+            self.tilemap.add_tile(tile_data)
         elif current_tile_type not in PHYSICS_TILES:
-            self.tilemap.offgrid_tiles.append(tile_data)
+            self.tilemap.add_offgrid_tile(tile_data)
                 
     def save_map(self):
         directory = 'data/maps'
@@ -613,12 +690,13 @@ class Editor:
             return
             
         # Remove grid tile
-        tile_loc = f"{tile_pos[0]};{tile_pos[1]}"
-        if tile_loc in self.tilemap.tilemap:
-            del self.tilemap.tilemap[tile_loc]
+        if tile_pos in self.tilemap.tilemap:
+            self.tilemap.remove_tile(tile_pos)
         
-        # Remove offgrid tiles
-        for tile in self.tilemap.offgrid_tiles.copy():
+        # Remove offgrid tiles, testing only those near the cursor
+        ts = self.tilemap.tile_size
+        near = self.tilemap.offgrid_near((mpos[0] + self.scroll[0]) / ts, (mpos[1] + self.scroll[1]) / ts)
+        for tile in near:
             tile_img = self.assets[tile['type']][tile['variant']]
             tile_r = pygame.Rect(
                 tile['pos'][0] * self.tilemap.tile_size - self.scroll[0], 
@@ -626,7 +704,7 @@ class Editor:
                 tile_img.get_width(), tile_img.get_height()
             )
             if tile_r.collidepoint(mpos):
-                self.tilemap.offgrid_tiles.remove(tile)
+                self.tilemap.remove_offgrid_tile(tile)
     
     def draw_grid(self):
         # Simplified grid drawing
@@ -889,12 +967,9 @@ class Editor:
             self.tilemap.render(self.display, offset=render_scroll, zoom=self.zoom)
             
             # Get current tile and mouse position
-            current_tile_img = self.assets[self.tile_list[self.tile_group]][self.tile_variant].copy()
-            
-            if self.tile_list[self.tile_group] == 'spikes':
-                current_tile_img = pygame.transform.rotate(current_tile_img, self.current_rotation)
-            
-            current_tile_img.set_alpha(100)
+            current_type = self.tile_list[self.tile_group]
+            rotation = self.current_rotation if current_type == 'spikes' else None
+            current_tile_img = self.sprites.faded(self.sprites.slot(pack_tile(current_type, self.tile_variant, rotation)), 100)
             
             mpos = pygame.mouse.get_pos()
             tile_pos = (int((mpos[0] + self.scroll[0]) // self.tilemap.tile_size), 
@@ -7,11 +7,16 @@ from scripts.constants import *
 from scripts.player import Player
 from scripts.humanagent import InputHandler
 from scripts.tilemap import Tilemap
+from scripts.sprites import SpriteTable
+from scripts.assets import asset_manager, TileAssets
+from scripts.music import music_player, map_track
 from scripts.GameTimer import GameTimer
+from scripts.replay import InputRecorder, prune_replays
+from scripts.ghost import Ghost, GhostRecorder, ghost_path
 from scripts.utils import (
     load_image, load_images, Animation, load_sounds, 
     draw_debug_info, update_camera_with_box, MenuScreen,
-    calculate_ui_constants, scale_font
+    calculate_ui_constants, scale_font, lerp
 )
 
 class PauseMenuScreen(MenuScreen):
@@ -137,8 +142,9 @@ class Environment:
         self.debug_mode = False
         self.movement_started = False
         self.scroll = [0, 0]
+        self.prev_scroll = [0, 0]
         self.render_scroll = [0, 0]
-        self.rotated_assets = {}
+        self.sprites = None
         self.show_rotation_values = False
 
         # Initialize fonts
@@ -147,8 +153,11 @@ class Environment:
         self.timer_font = pygame.font.Font(FONT, scale_font(24, DISPLAY_SIZE))
         
         # Initialize components
-        self.tilemap = Tilemap(self, tile_size=TILE_SIZE)
+        self.tilemap = Tilemap(self, tile_size=TILE_SIZE, bake_chunks=True)
         self.timer = GameTimer()
+        self.recorder = InputRecorder(TILE_SIZE)
+        self.ghost_recorder = GhostRecorder(TILE_SIZE)
+        self.ghost = None
         self.load_current_map()
         self.input_handler = InputHandler()
         self.game_menu = GameMenu(self)
@@ -168,7 +177,12 @@ class Environment:
         # Stop timer on level completion
         if self.player.finishLevel and self.timer.is_running:
             time = self.timer.stop()
-            print('new record:', self.set_map_best_time(time=time))
+            is_new_record = self.set_map_best_time(time=time)
+            print('new record:', is_new_record)
+            if is_new_record:
+                self.save_replay(time)
+                if self.is_map_best_time(time):
+                    self.save_ghost()
         
         self.timer.update()
     
@@ -186,26 +200,49 @@ class Environment:
     def reset_timer(self):
         self.timer.reset()
         self.movement_started = False
+        self.recorder.start(game_state_manager.selected_map)
+        self.ghost_recorder.start()
+
+    def save_replay(self, time):
+        # The replay's recorded result is checked by python -m scripts.replay verify
+        result = {'ticks': len(self.recorder.inputs), 'finished': True, 'time': time, 'pos': list(self.player.pos)}
+        try:
+            print('saved replay:', self.recorder.save(result))
+        except OSError as e:
+            print(f"Error saving replay: {e}")
+        prune_replays(self.recorder.map_path, self.map_best_times())
+
+    def save_ghost(self):
+        # Release the memory map first, the file can't be replaced while mapped on Windows
+        map_path = game_state_manager.selected_map
+        if self.ghost:
+            self.ghost.close()
+        try:
+            self.ghost_recorder.save(ghost_path(map_path))
+        except OSError as e:
+            print(f"Error saving ghost: {e}")
+        self.load_ghost(map_path)
+
+    def load_ghost(self, map_path):
+        if self.ghost:
+            self.ghost.close()
+        self.ghost = Ghost.load(map_path, self.assets, TILE_SIZE)
+
+    def close(self):
+        # Releases the ghost's memory map now rather than whenever this gets collected
+        if self.ghost:
+            self.ghost.close()
+            self.ghost = None
     
     def load_current_map(self):
         map_path = game_state_manager.selected_map
         self.tilemap.load(map_path)
+        self.recorder.start(map_path)
+        music_player.play(map_track(map_path))
         IMGscale = (self.tilemap.tile_size, self.tilemap.tile_size)
 
-        # Load assets
-        self.assets = {          
-            'decor': load_images('tiles/decor', scale=IMGscale),
-            'grass': load_images('tiles/grass', scale=IMGscale),
-            'stone': load_images('tiles/stone', scale=IMGscale),
-            'spawners': load_images('tiles/spawners', scale=IMGscale),
-            'spikes': load_images('tiles/spikes', scale=IMGscale),
-            'finish': load_images('tiles/finish', scale=IMGscale),
-            'ores': load_images('tiles/ores', scale=IMGscale),
-            'weather': load_images('tiles/weather', scale=IMGscale),
-            'kill': load_images('tiles/kill', scale=IMGscale),
-            'nether': load_images('tiles/nether', scale=IMGscale),
-            'wood': load_images('tiles/wood', scale=IMGscale),
-            'wool': load_images('tiles/wool', scale=IMGscale),       
+        # Load assets; tile families load with the map's tile types, others on first use
+        self.assets = TileAssets(IMGscale, {
             'player': load_image('player/player.png', scale=PLAYERS_IMAGE_SIZE),
             'player/run': Animation(load_images('player/run', scale=PLAYERS_IMAGE_SIZE), img_dur=5),
             'player/idle': Animation(load_images('player/idle', scale=PLAYERS_IMAGE_SIZE), img_dur=25),
@@ -214,9 +251,12 @@ class Environment:
             'player/jump': Animation(load_images('player/jump', scale=PLAYERS_IMAGE_SIZE), img_dur=4, loop=False),
             'player/fall': Animation(load_images('player/fall', scale=PLAYERS_IMAGE_SIZE), img_dur=4, loop=False),
             'player/death': Animation(load_images('player/death', scale=(PLAYERS_IMAGE_SIZE[0]*2, PLAYERS_IMAGE_SIZE[1])), img_dur=6, loop=False),
-            'saws': load_images('tiles/saws', scale=IMGscale),
-        }
+        })
+        self.assets.load(self.tilemap.tile_types())
+        asset_manager.save_bundle() # keeps what had to be decoded for the next launch
         
+        self.sprites = SpriteTable(self.assets, self.tilemap.tile_size)
+
         # Load background
         background_path = self.tilemap.get_background_map() or 'background/background.png'
         self.background = load_image(background_path, scale=DISPLAY_SIZE, remove_color=None)
@@ -230,6 +270,8 @@ class Environment:
             'click': load_sounds('click'),
         }
 
+        self.load_ghost(map_path)
+
         # Setup player
         self.pos = self.tilemap.extract([('spawners', 0), ('spawners', 1)])
         self.default_pos = self.pos[0]['pos'].copy() if self.pos else [10, 10]
@@ -239,11 +281,33 @@ class Environment:
         self.keys = {'left': False, 'right': False, 'jump': False}
         self.buffer_times = {'jump': 0}
     
+    def snapshot(self):
+        # The state a tick depends on, see Simulation.snapshot. Menus, sounds, the ghost and the
+        # replay recorder aren't part of it: restoring is for searching ahead in ai_train_mode.
+        keys = self.keys
+        return (self.player.snapshot(), self.timer.snapshot(), keys['left'], keys['right'], keys['jump'],
+                self.buffer_times['jump'], self.countdeathframes, self.movement_started, self.scroll[0], self.scroll[1])
+
+    def restore(self, state):
+        player_state, timer_state, left, right, jump, jump_buffer, self.countdeathframes, \
+            self.movement_started, self.scroll[0], self.scroll[1] = state
+        self.player.restore(player_state)
+        self.timer.restore(timer_state)
+        self.keys = {'left': left, 'right': right, 'jump': jump}
+        self.buffer_times = {'jump': jump_buffer}
+        # Nothing to interpolate from
+        self.prev_scroll = list(self.scroll)
+        self.player.prev_pos = self.player.pos.copy()
+
     def center_scroll_on_player(self):
         player_rect = self.player.rect()
         self.scroll[0] = player_rect.centerx - self.display.get_width() // 2
         self.scroll[1] = player_rect.centery - self.display.get_height() // 2
         self.render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
+
+        # Nothing to interpolate from after a teleport
+        self.prev_scroll = list(self.scroll)
+        self.player.prev_pos = self.player.pos.copy()
     
     def reset(self):
         # Reset all state variables
@@ -272,6 +336,10 @@ class Environment:
         game_state_manager.selected_map = next_map
         self.reset()
         self.tilemap.load(next_map)
+        self.assets.load(self.tilemap.tile_types())
+        asset_manager.save_bundle()
+        self.load_ghost(next_map)
+        music_player.play(map_track(next_map))
         
         # Update spawn position
         self.pos = self.tilemap.extract([('spawners', 0), ('spawners', 1)])
@@ -300,6 +368,18 @@ class Environment:
             json.dump(all_maps_data, f, indent=4)
 
         return is_new_record
+
+    def map_best_times(self):
+        current_map = game_state_manager.selected_map
+        current_index = str(os.path.basename(current_map).split('.')[0])
+
+        with open('metadata.json', 'r') as f:
+            all_maps_data = json.load(f)
+
+        return all_maps_data[current_index]['best_time']
+
+    def is_map_best_time(self, time):
+        return time <= min(self.map_best_times(), default=time)
     
     def return_to_main(self):
         self.reset()
@@ -328,15 +408,6 @@ class Environment:
         else:
             self.reset()
                 
-    def get_rotated_image(self, tile_type, variant, rotation):
-        key = f"{tile_type}_{variant}_{rotation}"
-        
-        if key not in self.rotated_assets:
-            original = self.assets[tile_type][variant]
-            self.rotated_assets[key] = pygame.transform.rotate(original, rotation)
-        
-        return self.rotated_assets[key]
-    
     def process_human_input(self, events):
         if not self.ai_train_mode:
             # Handle escape key
@@ -352,6 +423,9 @@ class Environment:
             self.keys, self.buffer_times = self.input_handler.process_events(events, self.menu)
     
     def update(self):
+        # Runs one fixed timestep tick
+        self.prev_scroll = list(self.scroll)
+        self.player.prev_pos = self.player.pos.copy()
         self.update_timer()
         
         if self.player.death:
@@ -374,18 +448,24 @@ class Environment:
                 self.game_menu.show_congratulations_menu()
             
         if not self.menu:
+            self.recorder.record(self.keys, self.buffer_times['jump'])
             self.player.update(self.tilemap, self.keys, self.countdeathframes)
+            self.ghost_recorder.record(self.player)
             update_camera_with_box(self.player, self.scroll, self.display.get_width(), self.display.get_height())
-            self.render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
 
-    def render(self):
+    def render(self, alpha=1.0):
+        # alpha is how far the frame lies between the previous tick and the current one
+        self.render_scroll = (int(lerp(self.prev_scroll[0], self.scroll[0], alpha)),
+                              int(lerp(self.prev_scroll[1], self.scroll[1], alpha)))
         self.display.blit(self.background, (0, 0))
         self.tilemap.render(self.display, offset=self.render_scroll)
 
         if self.debug_mode and not self.menu:
             self.debug_render()
 
-        self.player.render(self.display, offset=self.render_scroll)
+        if self.ghost:
+            self.ghost.render(self.display, self.ghost_recorder.count - 1, self.player.size, self.render_scroll, alpha)
+        self.player.render(self.display, offset=self.render_scroll, alpha=alpha)
         self.render_timer()
         
         if self.menu:
@@ -3,14 +3,24 @@ import pygame
 from scripts.environment import Environment
 from scripts.constants import *
 
+TICK_MS = 1000 / FPS # physics runs at a fixed FPS ticks per second whatever the frame rate
+MAX_TICKS_PER_FRAME = 5 # after a longer stall the game drops time instead of catching up
+
 class Game:
-    def __init__(self, display, clock):
+    def __init__(self, display, clock, uncapped=False):
         self.display = display
         self.clock = clock
         self.environment = None
+        self.uncapped = uncapped # one tick per frame with no frame cap, for benchmarks and fast-forward
+        self.accumulator = 0
+        self.last_frame_ticks = 0
         
     def initialize_environment(self):
+        if self.environment:
+            self.environment.close()
         self.environment = Environment(self.display, self.clock)
+        self.accumulator = 0
+        self.last_frame_ticks = pygame.time.get_ticks()
 
     def run(self):
         if not self.environment:
@@ -26,11 +36,24 @@ class Game:
                 if event.key == pygame.K_F3:  
                     self.environment.debug_mode = not self.environment.debug_mode  
                     print(f"Debug mode: {'ON' if self.environment.debug_mode else 'OFF'}")
+                if event.key == pygame.K_F4:
+                    self.uncapped = not self.uncapped
+                    print(f"Uncapped: {'ON' if self.uncapped else 'OFF'}")
         
         if self.environment.menu:
             self.environment.process_menu_events(events)
         else:
             self.environment.process_human_input(events)
         
-        self.environment.update()
-        self.environment.render()
\ No newline at end of file
+        now = pygame.time.get_ticks()
+        if self.uncapped:
+            self.accumulator = TICK_MS
+        else:
+            self.accumulator = min(self.accumulator + now - self.last_frame_ticks, MAX_TICKS_PER_FRAME * TICK_MS)
+        self.last_frame_ticks = now
+
+        while self.accumulator >= TICK_MS:
+            self.environment.update()
+            self.accumulator -= TICK_MS
+
+        self.environment.render(1.0 if self.uncapped else self.accumulator / TICK_MS)
\ No newline at end of file
@@ -0,0 +1,101 @@
+# ghost.py
+# Per-tick position log of the best run on a map, played back as a translucent player.
+import os
+import mmap
+import struct
+from scripts.replay import replay_folder
+from scripts.utils import lerp
+
+# Layout (little endian): magic, version, tick count, the tile size the run was recorded at,
+# then one fixed size record per tick. Positions are in pixels at that tile size.
+MAGIC = b'TBGST'
+VERSION = 2
+HEADER = struct.Struct('<5sHIH')
+RECORD = struct.Struct('<ffBBBx') # x, y, action id, animation image index, facing right
+GHOST_FILE = 'best.ghost'
+GHOST_ALPHA = 110
+
+ACTIONS = ['run', 'idle', 'wallslide', 'wallcollide', 'jump', 'fall', 'death']
+ACTION_IDS = {action: i for i, action in enumerate(ACTIONS)}
+
+def ghost_path(map_path):
+    return os.path.join(replay_folder(map_path), GHOST_FILE)
+
+class GhostRecorder:
+    def __init__(self, tile_size):
+        self.tile_size = tile_size
+        self.records = bytearray()
+        self.count = 0
+
+    def start(self):
+        self.records = bytearray()
+        self.count = 0
+
+    def record(self, player):
+        animation = player.animation
+        self.records += RECORD.pack(player.pos[0], player.pos[1], ACTION_IDS.get(player.action, 0),
+                                    int(animation.frame / animation.img_duration), player.facing_right)
+        self.count += 1
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.count, self.tile_size))
+            f.write(self.records)
+        os.replace(temp_path, path)
+
+class Ghost:
+    # Reads records straight from a memory map, so only the ticks that are drawn get touched
+    def __init__(self, path, assets, tile_size):
+        self.assets = assets
+        self.sprites = {}
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.count, recorded_tile_size = HEADER.unpack_from(self.data, 0)
+            if magic != MAGIC or version != VERSION or not recorded_tile_size or len(self.data) < HEADER.size + self.count * RECORD.size:
+                raise ValueError(f"{path} is not a version {VERSION} ghost")
+            # A ghost recorded on another screen size plays back scaled to this one
+            self.scale = tile_size / recorded_tile_size
+        except (OSError, ValueError, struct.error):
+            self.close()
+            raise
+
+    @classmethod
+    def load(cls, map_path, assets, tile_size):
+        try:
+            return cls(ghost_path(map_path), assets, tile_size)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def close(self):
+        if getattr(self, 'data', None) is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+    def record(self, tick):
+        return RECORD.unpack_from(self.data, HEADER.size + tick * RECORD.size)
+
+    def sprite(self, action_id, image_index, facing_right):
+        key = (action_id, image_index, facing_right)
+        if key not in self.sprites:
+            animation = self.assets['player/' + ACTIONS[action_id]]
+            images = animation.images if facing_right else animation.flipped
+            image = images[min(image_index, len(images) - 1)].copy()
+            image.set_alpha(GHOST_ALPHA)
+            self.sprites[key] = image
+        return self.sprites[key]
+
+    def render(self, surf, tick, size, offset=(0, 0), alpha=1.0):
+        # tick is the index of the record for the latest simulated tick of the current attempt
+        if self.data is None or not 0 <= tick < self.count:
+            return
+        x, y, action_id, image_index, facing_right = self.record(tick)
+        if tick > 0:
+            prev_x, prev_y = self.record(tick - 1)[:2]
+            x, y = lerp(prev_x, x, alpha), lerp(prev_y, y, alpha)
+        x, y = x * self.scale, y * self.scale
+        image = self.sprite(action_id, image_index, facing_right)
+        surf.blit(image, image.get_rect(center=(x + size[0] // 2 - offset[0], y + size[1] // 2 - offset[1])))
@@ -0,0 +1,103 @@
+# hazards.py
+# Hitboxes of interactive tiles (spikes, kill, finish), computed once per tile instead of per query
+from scripts.physics import INTERACTIVE_TILES
+from scripts.tilegrid import TYPE_MASK, type_id, pack_key, unpack_key, box_keys
+from scripts.collisionmesh import NEIGHBOR_KEY_OFFSETS
+
+INTERACTIVE_TYPE_IDS = {type_id(tile_type) for tile_type in INTERACTIVE_TILES}
+
+class HazardIndex:
+    # hazards[key] is the (box, (type, variant)) of the interactive grid tile at that cell;
+    # around[key] is the tuple of those entries for the 3x3 tiles around the cell, in the
+    # neighbour order the per-tile query used. Both are kept current on every edit.
+    # Off-grid hazards are hashed into every cell their box overlaps (offgrid[key]) and come
+    # after the grid entries in around[key], each once.
+    def __init__(self, world):
+        self.world = world
+        self.tile_size = world.tile_size
+        self.hazards = {}
+        self.offgrid = {} # key -> [(tile, (box, (type, variant)))] of off-grid hazards over that cell
+        self.around = {}
+        for key, code in world.tilemap.cells.items():
+            self.set_cell(key, code)
+        for tile in world.offgrid_tiles:
+            self.add_offgrid(tile)
+        keys = set(self.hazards) | set(self.offgrid)
+        self.update_around(set(key + offset for key in keys for offset in NEIGHBOR_KEY_OFFSETS))
+
+    def set_cell(self, key, code):
+        hazard = None
+        if (code & TYPE_MASK) in INTERACTIVE_TYPE_IDS:
+            x, y = unpack_key(key)
+            hazard = self.world.interactive_box(x, y, code)
+        if hazard:
+            self.hazards[key] = hazard
+        else:
+            self.hazards.pop(key, None)
+
+    def add_offgrid(self, tile):
+        hazard = self.world.offgrid_hazard(tile)
+        if not hazard:
+            return []
+        cells = box_keys(hazard[0], self.tile_size)
+        for key in cells:
+            self.offgrid.setdefault(key, []).append((tile, hazard))
+        return cells
+
+    def remove_offgrid(self, tile):
+        hazard = self.world.offgrid_hazard(tile)
+        if not hazard:
+            return []
+        cells = box_keys(hazard[0], self.tile_size)
+        for key in cells:
+            entries = [entry for entry in self.offgrid.get(key, ()) if entry[0] is not tile]
+            if entries:
+                self.offgrid[key] = entries
+            else:
+                self.offgrid.pop(key, None)
+        return cells
+
+    def update_around(self, keys):
+        hazards = self.hazards
+        offgrid = self.offgrid
+        for key in keys:
+            entries = [hazards[key + offset] for offset in NEIGHBOR_KEY_OFFSETS if key + offset in hazards]
+            for offset in NEIGHBOR_KEY_OFFSETS:
+                for tile, hazard in offgrid.get(key + offset, ()):
+                    if hazard not in entries:
+                        entries.append(hazard)
+            if entries:
+                self.around[key] = tuple(entries)
+            else:
+                self.around.pop(key, None)
+
+    def update_tile(self, x, y):
+        key = pack_key(x, y)
+        self.set_cell(key, self.world.tilemap.cells.get(key, 0))
+        # The cells whose neighbourhood contains this one are its own neighbours
+        self.update_around([key + offset for offset in NEIGHBOR_KEY_OFFSETS])
+
+    def update_offgrid(self, cells):
+        # After an off-grid tile was added or removed over these cells
+        self.update_around(set(key + offset for key in cells for offset in NEIGHBOR_KEY_OFFSETS))
+
+    def hazard_at(self, x, y):
+        return self.hazards.get(pack_key(x, y))
+
+    def hazards_around(self, key):
+        return self.around.get(key, ())
+
+    def hazards_in(self, areas):
+        # Entries over the cells of any of the pixel boxes, each once. Grid hazards lie inside
+        # their own cell and off-grid ones are hashed into every cell they cover, so this
+        # finds everything that can touch the areas.
+        entries = []
+        for area in areas:
+            for key in box_keys(area, self.tile_size):
+                hazard = self.hazards.get(key)
+                if hazard and hazard not in entries:
+                    entries.append(hazard)
+                for tile, hazard in self.offgrid.get(key, ()):
+                    if hazard not in entries:
+                        entries.append(hazard)
+        return entries
@@ -0,0 +1,177 @@
+# mapformat.py
+import os
+import sys
+import json
+import glob
+import struct
+import zlib
+from array import array
+from scripts.tilegrid import TileGrid, TILE_TYPES, TYPE_MASK, type_id, pack_key, pack_tile, tile_dict
+
+# Binary layout (little endian):
+#   header   magic, version, crc32 of the source JSON (0 if none), lowest_y
+#   strings  background path, then the tile type names used by this file
+#   grid     count, then int32 xs, int32 ys, uint32 codes
+#   offgrid  count, then float64 xs, float64 ys, uint32 codes
+# Codes are TileGrid codes whose type byte indexes the file's own type table.
+MAGIC = b'TBMAP'
+VERSION = 1
+BINARY_EXTENSION = '.tmap'
+HEADER = struct.Struct('<5sHIi')
+COUNT = struct.Struct('<I')
+
+def binary_path(path):
+    return os.path.splitext(path)[0] + BINARY_EXTENSION
+
+def file_crc(path):
+    with open(path, 'rb') as f:
+        return zlib.crc32(f.read())
+
+def _pack_str(text):
+    data = (text or '').encode('utf-8')
+    return struct.pack('<H', len(data)) + data
+
+def _read_str(data, offset):
+    length, = struct.unpack_from('<H', data, offset)
+    offset += 2
+    return data[offset:offset + length].decode('utf-8'), offset + length
+
+def _to_bytes(values):
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+def _read_array(typecode, data, offset, count):
+    values = array(typecode)
+    values.frombytes(data[offset:offset + count * values.itemsize])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values, offset + count * values.itemsize
+
+def write_binary(path, map_data, source_crc=0):
+    grid = map_data['tilemap']
+    if not isinstance(grid, TileGrid):
+        grid = TileGrid(grid)
+    offgrid = map_data['offgrid']
+
+    # The file stores its own type table so ids survive changes to TILE_TYPES
+    file_types = []
+    file_ids = {}
+    def file_code(code):
+        tile_type = TILE_TYPES[code & TYPE_MASK]
+        if tile_type not in file_ids:
+            file_ids[tile_type] = len(file_types)
+            file_types.append(tile_type)
+        return (code & ~TYPE_MASK) | file_ids[tile_type]
+
+    grid_xs, grid_ys, grid_codes = array('i'), array('i'), array('I')
+    for x, y, code in grid.iter_codes():
+        grid_xs.append(x)
+        grid_ys.append(y)
+        grid_codes.append(file_code(code))
+
+    offgrid_xs, offgrid_ys, offgrid_codes = array('d'), array('d'), array('I')
+    for tile in offgrid:
+        offgrid_xs.append(tile['pos'][0])
+        offgrid_ys.append(tile['pos'][1])
+        offgrid_codes.append(file_code(pack_tile(tile['type'], tile['variant'], tile.get('rotation'))))
+
+    parts = [
+        HEADER.pack(MAGIC, VERSION, source_crc, int(map_data.get('lowest_y', 0))),
+        _pack_str(map_data.get('map')),
+        struct.pack('<B', len(file_types)),
+        *[_pack_str(tile_type) for tile_type in file_types],
+        COUNT.pack(len(grid_codes)), _to_bytes(grid_xs), _to_bytes(grid_ys), _to_bytes(grid_codes),
+        COUNT.pack(len(offgrid_codes)), _to_bytes(offgrid_xs), _to_bytes(offgrid_ys), _to_bytes(offgrid_codes),
+    ]
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(b''.join(parts))
+    os.replace(temp_path, path)
+
+def read_binary(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a binary map")
+    magic, version, source_crc, lowest_y = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} binary map")
+
+    offset = HEADER.size
+    background, offset = _read_str(data, offset)
+    type_count, = struct.unpack_from('<B', data, offset)
+    offset += 1
+    remap = []
+    for _ in range(type_count):
+        tile_type, offset = _read_str(data, offset)
+        remap.append(type_id(tile_type))
+
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    xs, offset = _read_array('i', data, offset, count)
+    ys, offset = _read_array('i', data, offset, count)
+    codes, offset = _read_array('I', data, offset, count)
+    grid = TileGrid()
+    shared = grid.codes
+    grid.cells = {
+        pack_key(x, y): shared.setdefault(code, code)
+        for x, y, code in zip(xs, ys, [(code & ~TYPE_MASK) | remap[code & TYPE_MASK] for code in codes])
+    }
+
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    xs, offset = _read_array('d', data, offset, count)
+    ys, offset = _read_array('d', data, offset, count)
+    codes, offset = _read_array('I', data, offset, count)
+    offgrid = []
+    for x, y, code in zip(xs, ys, codes):
+        offgrid.append(tile_dict(x, y, (code & ~TYPE_MASK) | remap[code & TYPE_MASK]))
+
+    return {
+        'tilemap': grid,
+        'offgrid': offgrid,
+        'lowest_y': lowest_y,
+        'map': background or None,
+        'source_crc': source_crc,
+    }
+
+def load_map(path):
+    # JSON maps are read through a binary sibling that is rebuilt whenever the JSON changes
+    if path.endswith(BINARY_EXTENSION):
+        return read_binary(path)
+
+    with open(path, 'rb') as f:
+        source = f.read()
+    source_crc = zlib.crc32(source)
+    cache_path = binary_path(path)
+    try:
+        map_data = read_binary(cache_path)
+        if map_data['source_crc'] == source_crc:
+            return map_data
+    except (OSError, ValueError, struct.error):
+        pass
+
+    map_data = json.loads(source)
+    map_data['tilemap'] = TileGrid(map_data['tilemap'])
+    try:
+        write_binary(cache_path, map_data, source_crc)
+    except OSError:
+        pass
+    return map_data
+
+def convert(path):
+    with open(path, 'rb') as f:
+        source = f.read()
+    out_path = binary_path(path)
+    write_binary(out_path, json.loads(source), zlib.crc32(source))
+    return out_path
+
+def main(paths):
+    paths = paths or sorted(glob.glob(os.path.join('data', 'maps', '*.json')))
+    for path in paths:
+        out_path = convert(path)
+        print(f"{path} ({os.path.getsize(path)} bytes) -> {out_path} ({os.path.getsize(out_path)} bytes)")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -2,8 +2,9 @@ import pygame
 import random
 import os
 import json
-from scripts.constants import DISPLAY_SIZE, FONT, MENUBG    
-from scripts.utils import load_sounds, MenuScreen, render_text_with_shadow
+from scripts.constants import DISPLAY_SIZE, FONT
+from scripts.music import music_player, MENU_TRACK
+from scripts.utils import load_image, load_sounds, MenuScreen, render_text_with_shadow
 from scripts.GameManager import game_state_manager
 from scripts.utils import calculate_ui_constants
 
@@ -14,14 +15,11 @@ class Menu:
         self.screen = screen
         self.sfx = {
             'click': load_sounds('click'),
-            'music': pygame.mixer.Sound('data/sfx/music/music.mp3')
-        }  
-        self.played_music = False
+        }
          
         self.UI_CONSTANTS = calculate_ui_constants(DISPLAY_SIZE)
         
-        self.background = pygame.image.load(MENUBG)
-        self.background = pygame.transform.scale(self.background, DISPLAY_SIZE)
+        self.background = load_image('menugbg.png', scale=DISPLAY_SIZE, remove_color=None)
         
         
         self.player_type = game_state_manager.player_type
@@ -99,6 +97,7 @@ class Menu:
         self._play_sound('click')
 
     def run(self):
+        music_player.play(MENU_TRACK)
         self.screen.blit(self.background, (0, 0))
 
         events = pygame.event.get()
@@ -0,0 +1,61 @@
+# music.py
+# Background music streamed through pygame.mixer.music, so a track is never fully decoded
+# into memory. Short effects stay on preloaded Sounds (see AssetManager.sound_list).
+import os
+import pygame
+
+MUSIC_FOLDER = os.path.join('data', 'sfx', 'music')
+MENU_TRACK = 'music.mp3'
+FADE_MS = 600 # each half of a track change: fade the old one out, then the new one in
+MUSIC_VOLUME = 0.3
+SFX_CHANNELS = 16 # effects beyond this many at once are dropped instead of stealing channels
+
+def map_track(map_path):
+    # data/sfx/music/<map id>.mp3 if the map has its own track, otherwise the menu track
+    track = os.path.splitext(os.path.basename(map_path))[0] + '.mp3'
+    return track if os.path.isfile(os.path.join(MUSIC_FOLDER, track)) else MENU_TRACK
+
+class MusicPlayer:
+    # pygame.mixer.music has a single stream, so a change fades the current track out and the
+    # next one in once it has gone quiet. update() must be called every frame to do that.
+    # Missing files and a missing audio device just mean silence.
+    def __init__(self):
+        self.current = None # track playing or fading in
+        self.pending = None # track to start once the current one has faded out
+
+    def available(self):
+        return pygame.mixer.get_init() is not None
+
+    def play(self, track):
+        if not self.available() or track == (self.pending or self.current):
+            return
+        self.pending = track
+        if self.current is not None and pygame.mixer.music.get_busy():
+            pygame.mixer.music.fadeout(FADE_MS)
+        else:
+            self.start_pending()
+
+    def start_pending(self):
+        track, self.pending = self.pending, None
+        path = os.path.join(MUSIC_FOLDER, track)
+        self.current = track
+        if not os.path.isfile(path):
+            return
+        try:
+            pygame.mixer.music.load(path)
+            pygame.mixer.music.set_volume(MUSIC_VOLUME)
+            pygame.mixer.music.play(loops=-1, fade_ms=FADE_MS)
+        except pygame.error:
+            pass
+
+    def update(self):
+        if self.pending is not None and self.available() and not pygame.mixer.music.get_busy():
+            self.start_pending()
+
+    def stop(self):
+        self.pending = None
+        self.current = None
+        if self.available():
+            pygame.mixer.music.stop()
+
+music_player = MusicPlayer()
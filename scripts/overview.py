@@ -0,0 +1,121 @@
+# overview.py
+# The zoomed out editor view: one pixel per tile in the tile's average color, scaled up and
+# drawn in place of the tiles once they get too small to make out.
+# Needs numpy, which the game itself does not; only the editor builds an Overview.
+import heapq
+import numpy as np
+import pygame
+from scripts.tileworld import CHUNK_SIZE, offgrid_cell
+from scripts.tilegrid import COORD_BIAS, COORD_MASK
+
+LOD_SCREEN_TILES = 90 # tiles are drawn from the overview once the screen is this many tiles wide
+OVERVIEW_MARGIN = CHUNK_SIZE # spare tiles around the map so most edits don't resize the overview
+
+def lod_tile_size(display_width):
+    # Tile sizes below this switch to the overview. The default view is 28 tiles wide, so this
+    # covers the editor's three most zoomed out levels at any resolution.
+    return display_width // LOD_SCREEN_TILES
+
+class Overview:
+    def __init__(self, min_tile_size):
+        self.min_tile_size = min_tile_size
+        self.surface = None
+        self.origin = (0, 0)
+        self.scaled = None # part of the overview scaled to the tile size
+        self.scaled_area = None # (start_x, start_y, end_x, end_y, tile_size) in overview pixels
+
+    def drop(self):
+        self.surface = None
+        self.scaled = None
+
+    def colors_of(self, sprites, codes):
+        # Looks each distinct code up once, however many tiles share it
+        codes = np.asarray(codes, dtype=np.int64)
+        distinct, inverse = np.unique(codes, return_inverse=True)
+        palette = np.array([sprites.colors[sprites.slot(int(code))] for code in distinct], dtype=np.uint8)
+        return palette.reshape(-1, 3)[inverse]
+
+    def build(self, tilemap):
+        cells = tilemap.tilemap.cells
+        keys = np.fromiter(cells.keys(), dtype=np.uint64, count=len(cells))
+        grid_x = (keys >> np.uint64(32)).astype(np.int64) - COORD_BIAS
+        grid_y = (keys & np.uint64(COORD_MASK)).astype(np.int64) - COORD_BIAS
+        # Off-grid tiles in the order they are drawn, so grid tiles and later ones end up on top
+        offgrid = [(*offgrid_cell(tile['pos']), code) for _, code, tile in heapq.merge(*tilemap.offgrid_chunks.values())]
+        offgrid_x = np.array([x for x, _, _ in offgrid], dtype=np.int64)
+        offgrid_y = np.array([y for _, y, _ in offgrid], dtype=np.int64)
+
+        all_x = np.concatenate((grid_x, offgrid_x))
+        all_y = np.concatenate((grid_y, offgrid_y))
+        if not len(all_x):
+            all_x = all_y = np.zeros(1, dtype=np.int64)
+        min_x = int(all_x.min()) - OVERVIEW_MARGIN
+        min_y = int(all_y.min()) - OVERVIEW_MARGIN
+        width = int(all_x.max()) - min_x + OVERVIEW_MARGIN + 1
+        height = int(all_y.max()) - min_y + OVERVIEW_MARGIN + 1
+
+        sprites = tilemap.game.sprites
+        pixels = np.zeros((width, height, 3), dtype=np.uint8)
+        if offgrid:
+            pixels[offgrid_x - min_x, offgrid_y - min_y] = self.colors_of(sprites, [code for _, _, code in offgrid])
+        if cells:
+            pixels[grid_x - min_x, grid_y - min_y] = self.colors_of(sprites, list(cells.values()))
+        self.surface = pygame.Surface((width, height))
+        pygame.surfarray.blit_array(self.surface, pixels)
+        self.surface.set_colorkey((0, 0, 0))
+        self.origin = (min_x, min_y)
+
+    def cell_color(self, tilemap, x, y):
+        sprites = tilemap.game.sprites
+        code = tilemap.tilemap.code_at(x, y)
+        if not code:
+            # The off-grid tile drawn last among those centered in this cell, if any
+            chunks = {tilemap.chunk_of((x + dx, y + dy)) for dx in (-1, 0) for dy in (-1, 0)}
+            entries = [entry for chunk in chunks for entry in tilemap.offgrid_chunks.get(chunk, ())
+                       if offgrid_cell(entry[2]['pos']) == (x, y)]
+            code = max(entries)[1] if entries else 0
+        return sprites.colors[sprites.slot(code)] if code else (0, 0, 0)
+
+    def update(self, tilemap, x, y):
+        if self.surface is None:
+            return
+        x -= self.origin[0]
+        y -= self.origin[1]
+        if not (0 <= x < self.surface.get_width() and 0 <= y < self.surface.get_height()):
+            self.drop() # rebuilt with the new bounds on the next draw
+            return
+        color = self.cell_color(tilemap, x + self.origin[0], y + self.origin[1])
+        self.surface.set_at((x, y), color)
+        if self.scaled is not None:
+            start_x, start_y, end_x, end_y, ts = self.scaled_area
+            if start_x <= x < end_x and start_y <= y < end_y:
+                self.scaled.fill(color, ((x - start_x) * ts, (y - start_y) * ts, ts, ts))
+
+    def render(self, tilemap, surf, offset):
+        # Scales the visible part of the overview plus half a screen around it, and keeps
+        # reusing that until the view scrolls out of it or the zoom changes
+        if self.surface is None:
+            self.build(tilemap)
+        ts = tilemap.tile_size
+        origin_x, origin_y = self.origin
+        width, height = self.surface.get_size()
+        start_x = max(int(offset[0] // ts) - origin_x, 0)
+        start_y = max(int(offset[1] // ts) - origin_y, 0)
+        end_x = min(int((offset[0] + surf.get_width()) // ts) + 1 - origin_x, width)
+        end_y = min(int((offset[1] + surf.get_height()) // ts) + 1 - origin_y, height)
+        if end_x <= start_x or end_y <= start_y:
+            return
+
+        cached = self.scaled_area
+        if (self.scaled is None or cached[4] != ts or start_x < cached[0] or start_y < cached[1]
+                or end_x > cached[2] or end_y > cached[3]):
+            margin_x = (end_x - start_x) // 2
+            margin_y = (end_y - start_y) // 2
+            start_x, start_y = max(start_x - margin_x, 0), max(start_y - margin_y, 0)
+            end_x, end_y = min(end_x + margin_x, width), min(end_y + margin_y, height)
+            area = self.surface.subsurface((start_x, start_y, end_x - start_x, end_y - start_y))
+            self.scaled = pygame.transform.scale(area, ((end_x - start_x) * ts, (end_y - start_y) * ts))
+            self.scaled_area = (start_x, start_y, end_x, end_y, ts)
+
+        start_x, start_y = self.scaled_area[:2]
+        surf.blit(self.scaled, ((start_x + origin_x) * ts - offset[0], (start_y + origin_y) * ts - offset[1]))
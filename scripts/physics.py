@@ -0,0 +1,36 @@
+# physics.py
+# Gameplay constants that do not depend on pygame, shared by the game and the headless simulation.
+
+FPS = 60 # simulation ticks per second
+
+BASE_TILE_SIZE = 36 # tile size the per-frame tuning values below were authored for
+
+WALL_MOMENTUM_PRESERVE = 0.15  # Percentage of upward velocity preserved when hitting wall
+WALL_MOMENTUM_FRAMES = 3 # amount of frames activated
+
+PLAYER_BUFFER = 5 # amount of frame buffer
+COYOTE_TIME = 3  # Player can jump for 6 frames after leaving a platform
+
+PHYSICS_TILES = {'grass', 'stone', 'hardened_clay', 'ores', 'weather', 'nether', 'wood'}
+AUTOTILE_TYPES = {'grass', 'stone', 'hardened_clay', 'ores', 'weather','nether', 'wood'}
+INTERACTIVE_TILES = {'spikes', 'finish', 'saws', 'kill'}
+SPIKE_SIZE = (0.6, 0.25)
+SAW_SIZE = 0.8
+
+class PhysicsConstants:
+    # Per-frame movement values scaled to a tile size, written as value * tile_size / 36
+    # so they match the module level constants in scripts/constants.py bit for bit
+    def __init__(self, tile_size=BASE_TILE_SIZE):
+        self.tile_size = tile_size
+        self.player_speed = 0.8 * tile_size / BASE_TILE_SIZE # added per frame
+        self.jump_speed = 14 * tile_size / BASE_TILE_SIZE # initial jump velocity
+        self.wallslide_speed = 0.7 * tile_size / BASE_TILE_SIZE # the speed in which the player will slide off a wall
+        self.walljump_x_speed = 9 * tile_size / BASE_TILE_SIZE # the x velocity of the player when jumpingoff of a wall
+        self.walljump_y_speed = 15 * tile_size / BASE_TILE_SIZE # the y velocity of the player when jumpingoff of a wall
+        self.gravity_up = 0.6 * tile_size / BASE_TILE_SIZE # subtracted from y velocity every frame when player going up
+        self.gravity_down = 0.3 * tile_size / BASE_TILE_SIZE # subtracted from y velocity every frame when player going down
+        self.acceleration = 0.001 * tile_size / BASE_TILE_SIZE # friction with the ground on the x axis when starting to move
+        self.decceleration = 0.1 * tile_size / BASE_TILE_SIZE # friction with the ground on the x axis when stopping to move
+        self.max_x_speed = 10 * tile_size / BASE_TILE_SIZE # x axis speed limit
+        self.max_y_speed = 18 * tile_size / BASE_TILE_SIZE # y axis speed limit
+        self.players_size = (tile_size * 0.8, tile_size * 0.8) # size of actual player hitbox
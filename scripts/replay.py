@@ -0,0 +1,223 @@
+# replay.py
+# Records the per-tick input of a run and replays it headlessly through Simulation.
+import os
+import sys
+import json
+import glob
+import time
+import struct
+import uuid
+import zlib
+from scripts.physics import PhysicsConstants
+from scripts.simulation import Simulation
+
+# Layout (little endian): magic, version, length of the JSON info block, the info block,
+# then runs of identical ticks as (varint run length, input byte).
+# Input byte: bit 0 left, bit 1 right, bit 2 jump, bits 3-5 the jump buffer counter.
+MAGIC = b'TBRPL'
+VERSION = 1
+HEADER = struct.Struct('<5sHI')
+REPLAY_EXTENSION = '.replay'
+REPLAY_FOLDER = os.path.join('data', 'replays')
+
+LEFT = 1
+RIGHT = 2
+JUMP = 4
+BUFFER_SHIFT = 3
+BUFFER_MASK = 7
+
+def encode_input(keys, jump_buffer):
+    code = (LEFT if keys['left'] else 0) | (RIGHT if keys['right'] else 0) | (JUMP if keys['jump'] else 0)
+    return code | (min(jump_buffer, BUFFER_MASK) << BUFFER_SHIFT)
+
+def decode_input(code):
+    keys = {'left': bool(code & LEFT), 'right': bool(code & RIGHT), 'jump': bool(code & JUMP)}
+    return keys, (code >> BUFFER_SHIFT) & BUFFER_MASK
+
+def rle_encode(inputs):
+    data = bytearray()
+    i = 0
+    while i < len(inputs):
+        run = 1
+        while i + run < len(inputs) and inputs[i + run] == inputs[i]:
+            run += 1
+        length = run
+        while length >= 0x80:
+            data.append((length & 0x7F) | 0x80)
+            length >>= 7
+        data.append(length)
+        data.append(inputs[i])
+        i += run
+    return bytes(data)
+
+def rle_decode(data):
+    inputs = bytearray()
+    i = 0
+    while i < len(data):
+        length = shift = 0
+        while data[i] & 0x80:
+            length |= (data[i] & 0x7F) << shift
+            shift += 7
+            i += 1
+        length |= data[i] << shift
+        inputs.extend(bytes([data[i + 1]]) * length)
+        i += 2
+    return inputs
+
+def physics_info(tile_size):
+    # Physics constants as they read back from the replay's JSON block
+    return json.loads(json.dumps(vars(PhysicsConstants(tile_size))))
+
+def map_id_of(map_path):
+    return os.path.splitext(os.path.basename(map_path))[0]
+
+def replay_folder(map_path):
+    return os.path.join(REPLAY_FOLDER, map_id_of(map_path))
+
+def replay_name():
+    # Time first so a folder listing is chronological, the suffix keeps equal-length runs apart
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}{REPLAY_EXTENSION}"
+
+def write_replay(path, info, inputs):
+    info_data = json.dumps(info).encode('utf-8')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(info_data)) + info_data + rle_encode(inputs))
+    os.replace(temp_path, path)
+
+def read_replay(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a replay")
+    magic, version, info_length = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} replay")
+    info = json.loads(data[HEADER.size:HEADER.size + info_length].decode('utf-8'))
+    return info, rle_decode(data[HEADER.size + info_length:])
+
+class InputRecorder:
+    # Collects the input of the current attempt; Environment restarts it whenever the level resets
+    def __init__(self, tile_size):
+        self.tile_size = tile_size
+        self.map_path = None
+        self.inputs = bytearray()
+
+    def start(self, map_path):
+        self.map_path = map_path
+        self.inputs = bytearray()
+
+    def record(self, keys, jump_buffer):
+        self.inputs.append(encode_input(keys, jump_buffer))
+
+    def info(self, result):
+        with open(self.map_path, 'rb') as f:
+            map_crc = zlib.crc32(f.read())
+        return {
+            'map_id': map_id_of(self.map_path),
+            'map_path': self.map_path,
+            'map_crc': map_crc,
+            'tile_size': self.tile_size,
+            'physics': physics_info(self.tile_size),
+            'result': result,
+        }
+
+    def save(self, result, path=None):
+        path = path or os.path.join(replay_folder(self.map_path), replay_name())
+        write_replay(path, self.info(result), self.inputs)
+        return path
+
+def prune_replays(map_path, best_times):
+    # Keeps one replay per leaderboard time and deletes the rest, the newest replay wins a tie
+    wanted = list(best_times)
+    for path in sorted(glob.glob(os.path.join(replay_folder(map_path), '*' + REPLAY_EXTENSION)), reverse=True):
+        try:
+            recorded = read_replay(path)[0]['result']['time']
+        except (OSError, ValueError, KeyError):
+            continue  # not ours to judge, verify reports it
+        if recorded in wanted:
+            wanted.remove(recorded)
+            continue
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Error removing replay {path}: {e}")
+
+def run_result(sim):
+    return {
+        'ticks': sim.ticks,
+        'finished': sim.player.finishLevel,
+        'time': sim.timer.get_display_time(),
+        'pos': list(sim.player.pos),
+    }
+
+def replay(info, inputs):
+    sim = Simulation(info['map_path'], info['tile_size'])
+    decoded = [decode_input(code) for code in range(256)]
+    for code in inputs:
+        keys, jump_buffer = decoded[code]
+        sim.step(keys, jump_buffer)
+    return sim
+
+def verify(path):
+    # Returns a list of problems, empty when the replay reproduces its recorded result
+    info, inputs = read_replay(path)
+    problems = []
+    with open(info['map_path'], 'rb') as f:
+        if zlib.crc32(f.read()) != info['map_crc']:
+            problems.append("map changed since recording")
+    if physics_info(info['tile_size']) != info['physics']:
+        problems.append("physics constants changed since recording")
+    result = run_result(replay(info, inputs))
+    for key, expected in info['result'].items():
+        if result.get(key) != expected:
+            problems.append(f"{key} is {result.get(key)}, recorded {expected}")
+    return problems
+
+def verify_best_times(metadata_path='metadata.json'):
+    with open(metadata_path, 'r') as f:
+        all_maps_data = json.load(f)
+    failed = False
+    for map_id, map_data in all_maps_data.items():
+        verified = set()
+        for path in sorted(glob.glob(os.path.join(replay_folder(map_data['path']), '*' + REPLAY_EXTENSION))):
+            problems = verify(path)
+            if problems:
+                failed = True
+                print(f"{path}: FAILED ({'; '.join(problems)})")
+            else:
+                verified.add(read_replay(path)[0]['result']['time'])
+        for best_time in map_data['best_time']:
+            status = 'verified' if best_time in verified else 'no replay'
+            print(f"map {map_id} best time {best_time}: {status}")
+    return not failed
+
+def benchmark(paths):
+    ticks = 0
+    start = time.perf_counter()
+    for path in paths:
+        ticks += replay(*read_replay(path)).ticks
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths)} replays, {ticks} ticks in {elapsed:.2f}s ({ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+
+def main(args):
+    command = args[0] if args else 'verify'
+    paths = args[1:] or sorted(glob.glob(os.path.join(REPLAY_FOLDER, '*', '*' + REPLAY_EXTENSION)))
+    if command == 'verify':
+        if args[1:]:
+            failed = False
+            for path in paths:
+                problems = verify(path)
+                failed = failed or bool(problems)
+                print(f"{path}: {'; '.join(problems) if problems else 'ok'}")
+            return 1 if failed else 0
+        return 0 if verify_best_times() else 1
+    if command == 'bench':
+        benchmark(paths)
+        return 0
+    print("usage: python -m scripts.replay [verify|bench] [replay files]")
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,170 @@
+# rollout.py
+# Runs action sequences on the maps listed in metadata.json across worker processes.
+# Each worker keeps one headless Simulation per map and streams trajectories back over its pipe.
+import os
+import sys
+import json
+import time
+import random
+import multiprocessing
+from multiprocessing.connection import wait
+from array import array
+from scripts.physics import BASE_TILE_SIZE
+from scripts.simulation import Simulation
+
+# Per-tick action bytes
+LEFT = 1
+RIGHT = 2
+JUMP = 4
+
+# Per-tick trajectory flags
+DEAD = 1
+FINISHED = 2
+
+def pack_actions(actions):
+    # Accepts key dicts or (left, right, jump) tuples and packs them one byte per tick
+    packed = bytearray()
+    for action in actions:
+        if isinstance(action, dict):
+            action = (action['left'], action['right'], action['jump'])
+        packed.append((LEFT if action[0] else 0) | (RIGHT if action[1] else 0) | (JUMP if action[2] else 0))
+    return bytes(packed)
+
+def unpack_action(code):
+    return {'left': bool(code & LEFT), 'right': bool(code & RIGHT), 'jump': bool(code & JUMP)}
+
+def load_map_paths(metadata_path='metadata.json'):
+    with open(metadata_path, 'r') as f:
+        all_maps_data = json.load(f)
+    return {map_id: data['path'] for map_id, data in all_maps_data.items() if os.path.exists(data['path'])}
+
+def run_actions(sim, actions, stop_on_finish=True):
+    sim.reset()
+    positions = array('d')
+    flags = bytearray()
+    keys = [unpack_action(code) for code in range(8)]
+    for code in actions:
+        state = sim.step(keys[code])
+        positions.extend(state['player_pos'])
+        flags.append((DEAD if state['dead'] else 0) | (FINISHED if state['finished'] else 0))
+        if stop_on_finish and state['finished']:
+            break
+    return {
+        'positions': positions, # x, y pairs, one per tick
+        'flags': bytes(flags),
+        'ticks': sim.ticks,
+        'deaths': sim.deaths,
+        'finished': sim.player.finishLevel,
+        'time': sim.timer.get_display_time(),
+    }
+
+def worker_main(conn, map_paths, tile_size):
+    sims = {}
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        job_id, map_id, actions, stop_on_finish = message
+        try:
+            if map_id not in sims:
+                sims[map_id] = Simulation(map_paths[map_id], tile_size)
+            result = run_actions(sims[map_id], actions, stop_on_finish)
+            result['map_id'] = map_id
+            conn.send((job_id, result, None))
+        except Exception as e:
+            conn.send((job_id, None, f"{type(e).__name__}: {e}"))
+    conn.close()
+
+class RolloutPool:
+    def __init__(self, workers=None, tile_size=BASE_TILE_SIZE, metadata_path='metadata.json'):
+        self.map_paths = load_map_paths(metadata_path)
+        self.tile_size = tile_size
+        context = multiprocessing.get_context('spawn')
+        self.connections = []
+        self.processes = []
+        for _ in range(workers or os.cpu_count() or 1):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=worker_main, args=(child_conn, self.map_paths, tile_size), daemon=True)
+            process.start()
+            child_conn.close()
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+
+    def imap(self, jobs, stop_on_finish=True):
+        # jobs yields (map_id, actions); results stream back as (job index, result) in completion order
+        jobs = iter(enumerate(jobs))
+        idle = list(self.connections)
+        busy = []
+        try:
+            while True:
+                while idle:
+                    job = next(jobs, None)
+                    if job is None:
+                        break
+                    index, (map_id, actions) = job
+                    if not isinstance(actions, (bytes, bytearray)):
+                        actions = pack_actions(actions)
+                    conn = idle.pop()
+                    conn.send((index, str(map_id), bytes(actions), stop_on_finish))
+                    busy.append(conn)
+                if not busy:
+                    return
+                for conn in wait(busy):
+                    index, result, error = conn.recv()
+                    busy.remove(conn)
+                    idle.append(conn)
+                    if error:
+                        raise RuntimeError(f"rollout {index} failed: {error}")
+                    yield index, result
+        finally:
+            # Drop results still in flight so they don't leak into the next call
+            for conn in busy:
+                conn.recv()
+
+    def map(self, jobs, stop_on_finish=True):
+        results = {}
+        for index, result in self.imap(jobs, stop_on_finish):
+            results[index] = result
+        return [results[index] for index in range(len(results))]
+
+    def close(self):
+        for conn in self.connections:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+        self.connections = []
+        self.processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def random_actions(rng, ticks):
+    actions = []
+    keys = (False, False, False)
+    for tick in range(ticks):
+        if tick % 7 == 0:
+            keys = (rng.random() < 0.15, rng.random() > 0.3, rng.random() < 0.35)
+        actions.append(keys)
+    return pack_actions(actions)
+
+def main(args):
+    workers = int(args[0]) if args else None
+    rng = random.Random(0)
+    with RolloutPool(workers) as pool:
+        workers = len(pool.processes)
+        jobs = [(map_id, random_actions(rng, 2000)) for map_id in pool.map_paths for _ in range(4)]
+        start = time.perf_counter()
+        results = pool.map(jobs, stop_on_finish=False)
+        elapsed = time.perf_counter() - start
+    ticks = sum(result['ticks'] for result in results)
+    print(f"{len(results)} rollouts, {ticks} ticks on {workers} workers "
+          f"in {elapsed:.2f}s ({ticks / elapsed:.0f} ticks/s)")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,438 @@
+# simulation.py
+# Headless game core: player physics and level stepping without pygame, for AI training,
+# replays and automated level checks. The game's Player and Environment build on the same code.
+import os
+import sys
+import glob
+import time
+import random
+from scripts.physics import (
+    BASE_TILE_SIZE, PLAYER_BUFFER, COYOTE_TIME, WALL_MOMENTUM_PRESERVE, WALL_MOMENTUM_FRAMES, PhysicsConstants
+)
+from scripts.tileworld import TileWorld
+from scripts.GameTimer import GameTimer
+
+DEATH_FRAMES = 40 # ticks the death animation plays before the level resets
+SPAWNER_IDS = [('spawners', 0), ('spawners', 1)]
+NO_KEYS = {'left': False, 'right': False, 'jump': False}
+DEADLY_TILES = ('spikes', 'saws', 'kill')
+
+def load_level(map_path, tile_size=BASE_TILE_SIZE):
+    # Loads a map and takes out its spawner the way Environment does, returning (tilemap, spawn position)
+    tilemap = TileWorld(tile_size)
+    tilemap.load(map_path)
+    spawners = tilemap.extract(SPAWNER_IDS)
+    return tilemap, spawners[0]['pos'].copy() if spawners else [10, 10]
+
+def player_size(physics):
+    return (physics.players_size[0]*0.9, physics.players_size[1])
+
+def boxes_collide(a, b):
+    # Same test as pygame.Rect.colliderect for (x, y, width, height) boxes
+    return a[0] < b[0] + b[2] and a[1] < b[1] + b[3] and a[0] + a[2] > b[0] and a[1] + a[3] > b[1]
+
+class PlayerBody:
+    # Player physics state and movement. Boxes are truncated to ints like pygame.Rect,
+    # so stepping a body gives the same positions as the game does.
+    def __init__(self, pos, size, physics):
+        self.start_pos = pos
+        self.size = size
+        self.physics = physics
+        self._initialize()
+
+    def _initialize(self):
+        self.pos = list(self.start_pos)
+        self.velocity = [0, 0]
+        self.collisions = {'up': False, 'down': False, 'right': False, 'left': False}
+        self.air_time = 5
+        self.grounded = False
+        self.facing_right = True
+        self.jump_available = True  # Single flag to control jump availability
+        self.coyote_time = 0  # Track time since leaving ground
+        self.action = ''
+        self.death = False
+        self.finishLevel = False
+        self.respawn = False
+        self.was_colliding_wall = False
+        self.wall_contact_time = 0
+        self.wall_momentum_active = False
+        self.set_action('run')
+
+    def reset(self):
+        self._initialize()
+
+    def box(self):
+        return (int(self.pos[0]), int(self.pos[1]), int(self.size[0]), int(self.size[1]))
+
+    def snapshot(self):
+        # Everything step() reads or writes, as one flat tuple. Cheap enough to take every tick,
+        # e.g. to branch a search from it; the tilemap is shared, not copied.
+        collisions = self.collisions
+        return (self.pos[0], self.pos[1], self.velocity[0], self.velocity[1], self.air_time, self.coyote_time,
+                self.grounded, self.facing_right, self.jump_available, self.death, self.finishLevel,
+                self.was_colliding_wall, self.wall_contact_time, self.wall_momentum_active,
+                collisions['up'], collisions['down'], collisions['right'], collisions['left'], self.action)
+
+    def restore(self, state):
+        collisions = self.collisions
+        (self.pos[0], self.pos[1], self.velocity[0], self.velocity[1], self.air_time, self.coyote_time,
+         self.grounded, self.facing_right, self.jump_available, self.death, self.finishLevel,
+         self.was_colliding_wall, self.wall_contact_time, self.wall_momentum_active,
+         collisions['up'], collisions['down'], collisions['right'], collisions['left'], action) = state
+        self.set_action(action)
+
+    def set_action(self, action):
+        self.action = action
+
+    # Hooks for the game's Player to play sounds
+    def on_jump(self):
+        pass
+
+    def on_wall_hit(self):
+        pass
+
+    def can_coyote_jump(self):
+        return self.coyote_time <= COYOTE_TIME and not self.grounded
+
+    def sweep(self, tilemap, axis, start):
+        # Moves one axis (0 for x, 1 for y) by its velocity when that is at least the player's
+        # size, which the 3x3 queries can't handle: they only see the end position, so the
+        # player could step over a wall. Stops at the nearest solid box anywhere in the area
+        # the move crosses instead. Returns that area. Never happens at the stock speeds, so
+        # normal play never takes this path.
+        size = int(self.size[axis])
+        self.pos[axis] += self.velocity[axis]
+        area = [int(self.pos[0]), int(self.pos[1]), int(self.size[0]), int(self.size[1])]
+        end = area[axis]
+        area[axis] = min(start, end)
+        area[axis + 2] = size + abs(end - start)
+        hits = tilemap.physics_boxes_in(area)
+        if hits:
+            if self.velocity[axis] > 0:
+                end = min(box[axis] for box in hits) - size
+                self.collisions[('right', 'down')[axis]] = True
+            else:
+                end = max(box[axis] + box[axis + 2] for box in hits)
+                self.collisions[('left', 'up')[axis]] = True
+            self.pos[axis] = end
+            area[axis] = min(start, end)
+            area[axis + 2] = size + abs(end - start)
+        return tuple(area)
+
+    def swept_move(self, tilemap, axis):
+        # sweep() plus where it started from, as (axis, start position, area crossed)
+        start = (self.pos[0], self.pos[1])
+        return axis, start, self.sweep(tilemap, axis, int(start[axis]))
+
+    def contact_distance(self, axis, start, box):
+        # How far the body moves along axis from start before it touches box, 0 if it already does
+        size = int(self.size[axis])
+        if self.velocity[axis] > 0:
+            return max(0, box[axis] - (int(start[axis]) + size))
+        return max(0, int(start[axis]) - (box[axis] + box[axis + 2]))
+
+    def first_swept_hit(self, tilemap, swept):
+        # The interactive tile a swept step reaches first: by move, then by distance along it.
+        # Returns (move, distance, box, tile info) or None.
+        hits = []
+        for move, (axis, start, area) in enumerate(swept):
+            for box, tile_info in tilemap.interactive_boxes_in([area]):
+                if boxes_collide(area, box):
+                    hits.append((move, self.contact_distance(axis, start, box), box, tile_info))
+        return min(hits) if hits else None
+
+    def step(self, tilemap, keys, jump_buffer, countdeathframes=0):
+        physics = self.physics
+
+        # Steady-state stepping allocates nothing that outlives the tick: collisions and
+        # velocity are updated in place, and the neighbourhood queries return shared tuples,
+        # looked up again only when the player has moved to another cell.
+        velocity = self.velocity
+        collisions = self.collisions
+        if tilemap.is_below_map(self.pos):
+            self.death = True
+            velocity[0] = velocity[1] = 0
+            self.set_action('death')
+            return
+
+        if countdeathframes > DEATH_FRAMES or self.finishLevel:
+            return
+
+        collisions['up'] = collisions['down'] = collisions['right'] = collisions['left'] = False
+        if not self.death and not self.finishLevel:
+            self.velocity[0] += (int(keys['right']) - int(keys['left'])) * physics.player_speed
+            x_acceleration = (1 - physics.decceleration) if int(keys['right']) - int(keys['left']) == 0 else (1 - physics.acceleration)
+            self.velocity[0] = max(-physics.max_x_speed, min(physics.max_x_speed, self.velocity[0] * x_acceleration))
+
+            gravity = physics.gravity_down if self.velocity[1] > 0 and not keys['jump'] else physics.gravity_up
+            self.velocity[1] = max(-physics.max_y_speed, min(physics.max_y_speed, self.velocity[1] + gravity))
+        else:
+            self.velocity[0] = 0
+            self.velocity[1] = 0
+
+        width, height = int(self.size[0]), int(self.size[1])
+        key = None
+        swept = None # areas crossed by moves too long for the 3x3 queries, see sweep()
+
+        if abs(self.velocity[0]) >= width:
+            swept = [self.swept_move(tilemap, 0)]
+        else:
+            self.pos[0] += self.velocity[0]
+            entity_x, entity_y = int(self.pos[0]), int(self.pos[1])
+            key = tilemap.cell_key(self.pos)
+            boxes = tilemap.physics_boxes_at(key)
+            for box in boxes:
+                if entity_x < box[0] + box[2] and entity_y < box[1] + box[3] and entity_x + width > box[0] and entity_y + height > box[1]:
+                    if self.velocity[0] > 0:
+                        entity_x = box[0] - width
+                        self.collisions['right'] = True
+                    if self.velocity[0] < 0:
+                        entity_x = box[0] + box[2]
+                        self.collisions['left'] = True
+                    self.pos[0] = entity_x
+
+        if abs(self.velocity[1]) >= height:
+            swept = (swept or []) + [self.swept_move(tilemap, 1)]
+        else:
+            self.pos[1] += self.velocity[1]
+            entity_x, entity_y = int(self.pos[0]), int(self.pos[1])
+            moved_key = tilemap.cell_key(self.pos)
+            if moved_key != key:
+                key = moved_key
+                boxes = tilemap.physics_boxes_at(key)
+            for box in boxes:
+                if entity_x < box[0] + box[2] and entity_y < box[1] + box[3] and entity_x + width > box[0] and entity_y + height > box[1]:
+                    if self.velocity[1] > 0:
+                        entity_y = box[1] - height
+                        self.collisions['down'] = True
+                    if self.velocity[1] < 0:
+                        entity_y = box[1] + box[3]
+                        self.collisions['up'] = True
+                    self.pos[1] = entity_y
+
+        if swept:
+            # Everything touched along the way counts, not just what is around the end position.
+            # The first tile reached decides, and the body stops where it touched it.
+            swept.append((0, (self.pos[0], self.pos[1]), self.box())) # the end position, reached last
+            hit = self.first_swept_hit(tilemap, swept)
+            if hit:
+                move, distance, box, tile_info = hit
+                axis, start, _ = swept[move]
+                self.pos[0], self.pos[1] = start
+                self.pos[axis] += distance if self.velocity[axis] > 0 else -distance
+                if tile_info[0] in DEADLY_TILES:
+                    self.death = True
+                    velocity[0] = velocity[1] = 0
+                    self.set_action('death')
+                    return
+                self.finishLevel = True
+            hazards = ()
+        else:
+            hazards = tilemap.interactive_boxes_at(tilemap.cell_key(self.pos))
+        entity_x, entity_y = int(self.pos[0]), int(self.pos[1])
+        for box, tile_info in hazards:
+            if entity_x < box[0] + box[2] and entity_y < box[1] + box[3] and entity_x + width > box[0] and entity_y + height > box[1]:
+                tile_type = tile_info[0]
+                if tile_type in DEADLY_TILES:
+                    self.death = True
+                    velocity[0] = velocity[1] = 0
+                    self.set_action('death')
+                    return
+                elif tile_type == 'finish':
+                    self.finishLevel = True
+
+        if keys['right'] and not keys['left']:
+            self.facing_right = True
+        elif keys['left'] and not keys['right']:
+            self.facing_right = False
+
+        if self.collisions['right'] or self.collisions['left']:
+            self.velocity[0] = 0
+        if self.collisions['down'] or self.collisions['up']:
+            self.velocity[1] = 0
+
+        # Check if we just hit a wall this frame
+        now_colliding_wall = self.collisions['left'] or self.collisions['right']
+        if now_colliding_wall and not self.was_colliding_wall:
+            self.on_wall_hit()
+        self.was_colliding_wall = now_colliding_wall
+
+        # Update air time and grounded state
+        self.air_time += 1
+        was_grounded = self.grounded
+
+        if self.collisions['down']:
+            self.air_time = 0
+            self.coyote_time = 0  # Reset coyote time when landing
+
+        self.grounded = self.air_time <= 4
+
+        # Update coyote time - only increment if we just left the ground
+        if was_grounded and not self.grounded:
+            self.coyote_time = 0  # Start coyote timer when leaving ground
+        elif not self.grounded:
+            self.coyote_time += 1  # Increment coyote time while in air
+
+        if self.death:
+            self.set_action('death')
+        elif (self.collisions['left'] or self.collisions['right']) and self.velocity[1] > 0 and not self.grounded:
+            self.set_action('wallslide')
+        elif (self.collisions['left'] or self.collisions['right']):
+            self.set_action('wallcollide')
+        elif abs(self.velocity[0]) > 0.5:
+            self.set_action('run')
+        elif self.velocity[1] < 1 and not self.grounded:
+            self.set_action('jump')
+        elif self.velocity[1] > 1 and not self.grounded:
+            self.set_action('fall')
+        else:
+            self.set_action('idle')
+
+        # Reset jump availability when key is released
+        if not keys['jump']:
+            self.jump_available = True
+
+        # Handle jumps - Only if jump is available and key is pressed
+        elif keys['jump'] and self.jump_available:
+            self.jump_available = False
+
+            # Wall jump logic
+            if not self.grounded and (self.collisions['left'] or self.collisions['right']):
+                self.velocity[1] = -physics.walljump_y_speed
+                if self.collisions['right']: self.velocity[0] = -physics.walljump_x_speed
+                if self.collisions['left']: self.velocity[0] = physics.walljump_x_speed
+                self.on_jump()
+
+            # Regular jump logic (includes coyote jump)
+            elif (self.grounded or self.can_coyote_jump()) and jump_buffer <= PLAYER_BUFFER:
+                self.velocity[1] = -physics.jump_speed
+                self.air_time = 5
+                self.grounded = False
+                self.coyote_time = COYOTE_TIME + 1  # Disable coyote time after jumping
+                self.on_jump()
+
+        # Wall slide, wall slide momentum logic
+        if not self.grounded and (self.collisions['left'] or self.collisions['right']):
+            if not self.was_colliding_wall:
+                self.wall_contact_time = 0
+                if self.velocity[1] < 0:
+                    self.wall_momentum_active = True
+
+            self.wall_contact_time += 1
+
+            if self.wall_momentum_active and self.wall_contact_time <= WALL_MOMENTUM_FRAMES:
+                self.velocity[1] *= WALL_MOMENTUM_PRESERVE
+            else:
+                self.wall_momentum_active = False
+                if self.velocity[1] > 0:
+                    self.velocity[1] = min(physics.wallslide_speed, self.velocity[1])
+
+        # Cut jump short if key released
+        if not keys['jump'] and self.velocity[1] < 0:
+            self.velocity[1] = 0
+
+class Simulation:
+    # One level stepped tick by tick the way Environment.update does it, minus rendering,
+    # sound and menus. A finished level stays finished until reset() is called.
+    def __init__(self, map_path, tile_size=BASE_TILE_SIZE):
+        self.map_path = map_path
+        self.physics = PhysicsConstants(tile_size)
+        self.tilemap, self.default_pos = load_level(map_path, tile_size)
+        self.player = PlayerBody(self.default_pos.copy(), player_size(self.physics), self.physics)
+        self.timer = GameTimer()
+        self.reset()
+
+    def reset(self):
+        self.respawn()
+        self.ticks = 0
+        self.deaths = 0
+
+    def respawn(self):
+        # Same state Environment.reset restores after a death
+        self.player.reset()
+        self.player.pos = self.default_pos.copy()
+        self.keys = dict(NO_KEYS)
+        self.jump_buffer = 0
+        self.countdeathframes = 0
+        self.movement_started = False
+        self.timer.reset()
+
+    def snapshot(self):
+        # Level state on top of PlayerBody.snapshot(), for restore() to branch from
+        keys = self.keys
+        return (self.player.snapshot(), self.timer.snapshot(), keys['left'], keys['right'], keys['jump'],
+                self.jump_buffer, self.countdeathframes, self.movement_started, self.ticks, self.deaths)
+
+    def restore(self, state):
+        player_state, timer_state, left, right, jump, self.jump_buffer, self.countdeathframes, \
+            self.movement_started, self.ticks, self.deaths = state
+        self.player.restore(player_state)
+        self.timer.restore(timer_state)
+        self.keys = {'left': left, 'right': right, 'jump': jump}
+
+    def update_timer(self):
+        if not self.movement_started and (self.keys['left'] or self.keys['right'] or self.keys['jump']):
+            self.movement_started = True
+            self.timer.start()
+
+        if self.player.finishLevel and self.timer.is_running:
+            self.timer.stop()
+
+        self.timer.update()
+
+    def step(self, keys, jump_buffer=None):
+        # jump_buffer defaults to the count the AI input path keeps: ticks jump has been held
+        if jump_buffer is None:
+            jump_buffer = min(self.jump_buffer + 1, PLAYER_BUFFER + 1) if keys['jump'] else 0
+        self.keys = keys
+        self.jump_buffer = jump_buffer
+        self.update_timer()
+
+        player = self.player
+        if player.death:
+            self.countdeathframes += 1
+            if self.countdeathframes >= DEATH_FRAMES:
+                self.respawn()
+
+        if not player.finishLevel:
+            was_dead = player.death
+            player.step(self.tilemap, self.keys, self.jump_buffer, self.countdeathframes)
+            if player.death and not was_dead:
+                self.deaths += 1
+        self.ticks += 1
+        return self.get_state()
+
+    def get_state(self):
+        player = self.player
+        return {
+            'player_pos': (player.pos[0], player.pos[1]),
+            'player_vel': player.velocity,
+            'player_grounded': player.grounded,
+            'player_air_time': player.air_time,
+            'collisions': dict(player.collisions), # the player updates its own in place
+            'finished': player.finishLevel,
+            'dead': player.death,
+            'ticks': self.ticks,
+            'deaths': self.deaths,
+            'time': self.timer.get_display_time(),
+        }
+
+def run_benchmark(map_paths, ticks, seed=0):
+    rng = random.Random(seed)
+    total_ticks = 0
+    start = time.perf_counter()
+    for map_path in map_paths:
+        sim = Simulation(map_path)
+        keys = dict(NO_KEYS)
+        for tick in range(ticks):
+            if tick % 7 == 0:
+                keys = {'left': rng.random() < 0.15, 'right': rng.random() > 0.3, 'jump': rng.random() < 0.35}
+            if sim.step(keys)['finished']:
+                sim.reset()
+        total_ticks += ticks
+    elapsed = time.perf_counter() - start
+    print(f"{total_ticks} ticks over {len(map_paths)} maps in {elapsed:.2f}s ({total_ticks / elapsed:.0f} ticks/s)")
+
+if __name__ == '__main__':
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join('data', 'maps', '*.json')))
+    run_benchmark(paths, 2000)
@@ -0,0 +1,118 @@
+# sprites.py
+import math
+import pygame
+from scripts.tilegrid import TILE_TYPES, TYPE_MASK, pack_tile, VARIANT_SHIFT, ROTATION_SHIFT, ROTATION_FLAG
+from scripts.tileworld import SPIKES_ID
+
+ROTATIONS = 4 # slots per variant: 0, 90, 180 and 270 degrees
+
+class SpriteTable:
+    # Every tile image in one flat list, built when the assets load. A tile code maps to
+    # its slot with integer arithmetic, so drawing a tile needs no string keys or transforms.
+    # Only spikes are drawn rotated; the other types fill their rotation slots with the
+    # unrotated image.
+    # The distinct images are also packed into one atlas surface so a whole layer of tiles
+    # can be drawn with a single Surface.blits call. Tile images are colorkeyed on black,
+    # and so is the atlas.
+    def __init__(self, assets, tile_size):
+        self.assets = assets
+        self.tile_size = tile_size
+        self.images = []
+        self.offsets = [] # (x, y) to add to the tile's pixel position, centers rotated images
+        self.type_slots = [] # first slot of each type id, None for types not loaded
+        self.type_counts = [] # number of variants of each type id
+        self.translucent = {} # (slot, alpha) -> faded copy, for editor previews
+        for type_id, tile_type in enumerate(TILE_TYPES):
+            if tile_type in assets:
+                self.add_images(type_id, assets[tile_type])
+        self.build_atlas()
+
+    def add_images(self, type_id, images):
+        self.type_slots.extend([None] * (type_id + 1 - len(self.type_slots)))
+        self.type_counts.extend([0] * (type_id + 1 - len(self.type_counts)))
+        self.type_slots[type_id] = len(self.images)
+        self.type_counts[type_id] = len(images)
+        for img in images:
+            for rotation in range(ROTATIONS):
+                if type_id == SPIKES_ID:
+                    rotated = pygame.transform.rotate(img, rotation * 90)
+                    self.images.append(rotated)
+                    self.offsets.append((-((rotated.get_width() - self.tile_size) // 2),
+                                         -((rotated.get_height() - self.tile_size) // 2)))
+                else:
+                    self.images.append(img)
+                    self.offsets.append((0, 0))
+
+    def add_type(self, type_id):
+        # For a type that wasn't loaded when the table was built; looking it up in the assets
+        # loads it if they are a TileAssets
+        self.add_images(type_id, self.assets[TILE_TYPES[type_id]])
+        self.build_atlas()
+
+    def build_atlas(self):
+        # Grid packing: tile images share one size, rotated spikes included
+        unique = list({id(img): img for img in self.images}.values())
+        cell_w = max((img.get_width() for img in unique), default=1)
+        cell_h = max((img.get_height() for img in unique), default=1)
+        columns = max(1, math.ceil(math.sqrt(len(unique))))
+        rows = max(1, math.ceil(len(unique) / columns))
+        self.atlas = pygame.Surface((columns * cell_w, rows * cell_h))
+        self.atlas.set_colorkey((0, 0, 0))
+        areas = {}
+        for i, img in enumerate(unique):
+            pos = ((i % columns) * cell_w, (i // columns) * cell_h)
+            self.atlas.blit(img, pos)
+            areas[id(img)] = pygame.Rect(pos, img.get_size())
+        self.areas = [areas[id(img)] for img in self.images] # slot -> source rect in the atlas
+        self.colors = self.average_colors()
+
+    def average_colors(self):
+        # Mean color of each slot's visible pixels, for the zoomed out overview. Kept off pure
+        # black, which the overview uses for empty cells.
+        colors = {}
+        for img in self.images:
+            if id(img) in colors:
+                continue
+            visible = pygame.mask.from_surface(img).count()
+            total = img.get_width() * img.get_height()
+            average = pygame.transform.average_color(img)
+            colors[id(img)] = tuple(max(1, min(255, channel * total // visible)) if visible else 1 for channel in average[:3])
+        return [colors[id(img)] for img in self.images]
+
+    def slot(self, code):
+        type_id = code & TYPE_MASK
+        variant = (code >> VARIANT_SHIFT) & 0xFF
+        try:
+            slot = self.type_slots[type_id] + variant * ROTATIONS
+        except (IndexError, TypeError):
+            self.add_type(type_id)
+            return self.slot(code)
+        if variant >= self.type_counts[type_id]:
+            # Same error assets[type][variant] gives, rather than drawing the next type's image
+            raise IndexError(f"{TILE_TYPES[type_id]} has no variant {variant}")
+        if code & ROTATION_FLAG:
+            slot += (code >> ROTATION_SHIFT) & 3
+        return slot
+
+    def image(self, tile_type, variant, rotation=0):
+        return self.images[self.slot(pack_tile(tile_type, variant, rotation))]
+
+    def faded(self, slot, alpha):
+        key = (slot, alpha)
+        if key not in self.translucent:
+            image = self.images[slot].copy()
+            image.set_alpha(alpha)
+            self.translucent[key] = image
+        return self.translucent[key]
+
+    def item(self, code, x, y):
+        # One (source, dest, area) entry for Surface.blits
+        slot = self.slot(code)
+        offset = self.offsets[slot]
+        return (self.atlas, (x + offset[0], y + offset[1]), self.areas[slot])
+
+    def blit(self, surf, code, x, y):
+        # x, y is the tile's top left corner in pixels on surf
+        slot = self.slot(code)
+        offset = self.offsets[slot]
+        surf.blit(self.images[slot], (x + offset[0], y + offset[1]))
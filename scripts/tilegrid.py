@@ -0,0 +1,126 @@
+# tilegrid.py
+from collections.abc import MutableMapping
+
+COORD_BIAS = 1 << 31 # shifts signed tile coordinates into an unsigned 32 bit range
+COORD_MASK = (1 << 32) - 1
+
+TYPE_MASK = 0xFF
+VARIANT_SHIFT = 8
+ROTATION_SHIFT = 16
+ROTATION_FLAG = 1 << 18 # set when the tile carries an explicit 'rotation' value
+
+# Type ids start at 1 so a code of 0 can mean "no tile"
+TILE_TYPES = [None, 'decor', 'grass', 'stone', 'spawners', 'spikes', 'finish', 'ores',
+              'weather', 'kill', 'nether', 'wood', 'wool', 'saws', 'hardened_clay']
+TILE_TYPE_IDS = {tile_type: i for i, tile_type in enumerate(TILE_TYPES) if tile_type}
+
+def type_id(tile_type):
+    if tile_type not in TILE_TYPE_IDS:
+        TILE_TYPES.append(tile_type)
+        TILE_TYPE_IDS[tile_type] = len(TILE_TYPES) - 1
+    return TILE_TYPE_IDS[tile_type]
+
+def pack_key(x, y):
+    return ((x + COORD_BIAS) << 32) | (y + COORD_BIAS)
+
+def unpack_key(key):
+    return ((key >> 32) - COORD_BIAS, (key & COORD_MASK) - COORD_BIAS)
+
+def key_offset(dx, dy):
+    # pack_key is linear, so pack_key(x + dx, y + dy) == pack_key(x, y) + key_offset(dx, dy)
+    return (dx << 32) + dy
+
+def box_keys(box, tile_size):
+    # Keys of the tile cells a pixel box (x, y, width, height) overlaps
+    x, y, width, height = box
+    return [pack_key(tx, ty) for ty in range(int(y // tile_size), int((y + height - 1) // tile_size) + 1)
+            for tx in range(int(x // tile_size), int((x + width - 1) // tile_size) + 1)]
+
+def pack_tile(tile_type, variant, rotation=None):
+    # Out of range values would spill into the rotation bits: variants are clamped to 0..255
+    # and unknown rotations read as 0, with a warning, so hand edited maps still load
+    if not 0 <= variant <= 0xFF:
+        print(f"Warning: tile variant {variant} of {tile_type} is outside 0..255, clamping")
+        variant = max(0, min(0xFF, int(variant)))
+    code = type_id(tile_type) | (variant << VARIANT_SHIFT)
+    if rotation is not None:
+        if rotation not in (0, 90, 180, 270):
+            print(f"Warning: tile rotation {rotation} of {tile_type} is not 0, 90, 180 or 270, using 0")
+            rotation = 0
+        code |= (int(rotation) // 90) << ROTATION_SHIFT | ROTATION_FLAG
+    return code
+
+def tile_type(code):
+    return TILE_TYPES[code & TYPE_MASK]
+
+def tile_variant(code):
+    return (code >> VARIANT_SHIFT) & 0xFF
+
+def tile_rotation(code):
+    if code & ROTATION_FLAG:
+        return ((code >> ROTATION_SHIFT) & 3) * 90
+    return None
+
+def tile_dict(x, y, code):
+    tile = {'type': tile_type(code), 'variant': tile_variant(code), 'pos': [x, y]}
+    if code & ROTATION_FLAG:
+        tile['rotation'] = tile_rotation(code)
+    return tile
+
+def parse_loc(loc):
+    if isinstance(loc, str):
+        x, y = loc.split(';')
+        return int(x), int(y)
+    return int(loc[0]), int(loc[1])
+
+class TileGrid(MutableMapping):
+    # Grid tiles stored as packed int codes keyed by packed int coordinates.
+    # The mapping interface mirrors the old {"x;y": tile_dict} layout; dicts it
+    # returns are built on demand, so edit tiles through __setitem__ rather than in place.
+    def __init__(self, tiles=None):
+        self.cells = {}
+        self.codes = {} # shares one int object per distinct tile code
+        if tiles:
+            for loc, tile in tiles.items():
+                self[loc] = tile
+
+    def code_at(self, x, y):
+        return self.cells.get(pack_key(x, y), 0)
+
+    def set_code(self, x, y, code):
+        self.cells[pack_key(x, y)] = self.codes.setdefault(code, code)
+
+    def discard(self, x, y):
+        return self.cells.pop(pack_key(x, y), 0)
+
+    def iter_codes(self):
+        for key, code in self.cells.items():
+            x, y = unpack_key(key)
+            yield x, y, code
+
+    def __getitem__(self, loc):
+        x, y = parse_loc(loc)
+        code = self.cells.get(pack_key(x, y), 0)
+        if not code:
+            raise KeyError(loc)
+        return tile_dict(x, y, code)
+
+    def __setitem__(self, loc, tile):
+        x, y = parse_loc(loc)
+        self.set_code(x, y, pack_tile(tile['type'], tile['variant'], tile.get('rotation')))
+
+    def __delitem__(self, loc):
+        x, y = parse_loc(loc)
+        if not self.discard(x, y):
+            raise KeyError(loc)
+
+    def __contains__(self, loc):
+        return pack_key(*parse_loc(loc)) in self.cells
+
+    def __iter__(self):
+        for key in self.cells:
+            x, y = unpack_key(key)
+            yield f"{x};{y}"
+
+    def __len__(self):
+        return len(self.cells)
@@ -1,191 +1,124 @@
 # tilemap.py
-import json
+import heapq
 import pygame
-from scripts.constants import PHYSICS_TILES, INTERACTIVE_TILES, SPIKE_SIZE
+from scripts.tileworld import TileWorld, CHUNK_SIZE, offgrid_cell
+from scripts.tilegrid import unpack_key, parse_loc
 
-NEIGHBOR_OFFSETS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (0, 0), (-1, 1), (0, 1), (1, 1)]
+BAKE_CACHE_BYTES = 32 * 1024 * 1024 # baked chunk pixels kept at most; chunks past it draw tile by tile
 
-class Tilemap:
-    def __init__(self, game, tile_size=16):
+class Tilemap(TileWorld):
+    def __init__(self, game, tile_size=16, bake_chunks=False, overview=None):
+        super().__init__(tile_size)
         self.game = game
-        self.tile_size = tile_size
-        self.tilemap = {}
-        self.offgrid_tiles = []
-        self.lowest_y = 0
-        self.map_background = None
-    
-    def tiles_around(self, pos):
-        tiles = []
-        tile_loc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
-        for offset in NEIGHBOR_OFFSETS:
-            check_loc = str(tile_loc[0] + offset[0]) + ';' + str(tile_loc[1] + offset[1])
-            if check_loc in self.tilemap:
-                tiles.append(self.tilemap[check_loc])
-        return tiles
-    
-    def extract(self, id_pairs, keep=False):
-        matches = []
-        for tile in self.offgrid_tiles.copy():
-            if (tile['type'], tile['variant']) in id_pairs:
-                matches.append(tile.copy())
-                if not keep:
-                    self.offgrid_tiles.remove(tile)
-        
-        tilemap_keys = list(self.tilemap.keys())
-        for loc in tilemap_keys:
-            tile = self.tilemap[loc]
-            if (tile['type'], tile['variant']) in id_pairs:
-                match = tile.copy()
-                if isinstance(match['pos'], tuple):
-                    match['pos'] = list(match['pos'])
-                else:
-                    match['pos'] = match['pos'].copy()
-                match['pos'][0] *= self.tile_size
-                match['pos'][1] *= self.tile_size
-                matches.append(match)
-                if not keep:
-                    del self.tilemap[loc]
-        
-        return matches
-
-    def save(self, path):
-        lowest_y = 0
-        for loc in self.tilemap:
-            tile = self.tilemap[loc]
-            lowest_y = max(lowest_y, tile['pos'][1])
-
-        spawner_tiles = self.extract([('spawners', 0), ('spawners', 1)], keep=True)
-        if len(spawner_tiles) > 1:
-            self.extract([('spawners', 0), ('spawners', 1)], keep=False)
-            spawner = spawner_tiles[0]
-            if 'pos' in spawner:
-                pos = spawner['pos'].copy()
-                if len(str(pos[0]).split('.')) == 1:
-                    pos[0] = pos[0] // self.tile_size
-                    pos[1] = pos[1] // self.tile_size
-                
-                tile_loc = f"{int(pos[0])};{int(pos[1])}"
-                self.tilemap[tile_loc] = {
-                    'type': spawner['type'], 
-                    'variant': spawner['variant'], 
-                    'pos': [int(pos[0]), int(pos[1])]
-                }
-        
-        f = open(path, 'w')
-        json.dump({
-            'tilemap': self.tilemap, 
-            'offgrid': self.offgrid_tiles,
-            'lowest_y': lowest_y,
-            'map': self.map_background
-        }, f, indent=4)
-        f.close()
-        
-    def load(self, path):
-        with open(path, 'r') as f:
-            map_data = json.load(f)
-        self.tilemap = map_data['tilemap']
-        self.offgrid_tiles = map_data['offgrid']
-        self.lowest_y = map_data.get('lowest_y', 0)
-        self.map_background = map_data.get('map', None)
-
-        spawner_tiles = self.extract([('spawners', 0), ('spawners', 1)], keep=True)
-        if len(spawner_tiles) > 1:
-            self.extract([('spawners', 0), ('spawners', 1)], keep=False)
-            spawner = spawner_tiles[0]
-            if 'pos' in spawner:
-                pos = spawner['pos'].copy()
-                if len(str(pos[0]).split('.')) == 1:
-                    pos[0] = pos[0] // self.tile_size
-                    pos[1] = pos[1] // self.tile_size
-                
-                tile_loc = f"{int(pos[0])};{int(pos[1])}"
-                self.tilemap[tile_loc] = {
-                    'type': spawner['type'], 
-                    'variant': spawner['variant'], 
-                    'pos': [int(pos[0]), int(pos[1])]
-                }
-    
+        self.bake_chunks = bake_chunks # draw grid tiles from cached per-chunk surfaces
+        self.chunk_surfaces = {}
+        self.baked_tile_size = tile_size
+        self.overview = overview # an Overview, drawn instead of the tiles below its tile size
+
+    def build_index(self):
+        super().build_index()
+        if self.overview is not None:
+            self.overview.drop()
+
+    def add_tile(self, tile):
+        super().add_tile(tile)
+        self.update_overview(*parse_loc(tile['pos']))
+
+    def remove_tile(self, loc):
+        tile = super().remove_tile(loc)
+        self.update_overview(*parse_loc(loc))
+        return tile
+
+    def add_offgrid_tile(self, tile):
+        super().add_offgrid_tile(tile)
+        self.update_overview(*offgrid_cell(tile['pos']))
+
+    def remove_offgrid_tile(self, tile):
+        super().remove_offgrid_tile(tile)
+        self.update_overview(*offgrid_cell(tile['pos']))
+
+    def update_overview(self, x, y):
+        if self.overview is not None:
+            self.overview.update(self, x, y)
+
+    def invalidate_chunk(self, chunk):
+        self.chunk_surfaces.pop(chunk, None)
+
+    def invalidate_chunks(self):
+        self.chunk_surfaces.clear()
+        self.baked_tile_size = self.tile_size
+
+    def visible_chunks(self, offset, size):
+        # Off-grid tiles can overhang their chunk by up to one tile, so pad the left/top edge
+        chunk_span = CHUNK_SIZE * self.tile_size
+        start_x = int((offset[0] - self.tile_size) // chunk_span)
+        end_x = int((offset[0] + size[0]) // chunk_span)
+        start_y = int((offset[1] - self.tile_size) // chunk_span)
+        end_y = int((offset[1] + size[1]) // chunk_span)
+        return [(cx, cy) for cy in range(start_y, end_y + 1) for cx in range(start_x, end_x + 1)]
+
     def physics_rects_around(self, pos):
-        rects = []
-        for tile in self.tiles_around(pos):
-            if tile['type'] in PHYSICS_TILES:
-                rects.append(pygame.Rect(tile['pos'][0] * self.tile_size, tile['pos'][1] * self.tile_size, self.tile_size, self.tile_size))
-        return rects
-    
-    def get_spike_rect_with_rotation(self, tile):
-        spike_width = int(self.tile_size * SPIKE_SIZE[0])
-        spike_height = int(self.tile_size * SPIKE_SIZE[1])
-        rotation = tile.get('rotation', 0)
-        
-        tile_x = tile['pos'][0] * self.tile_size
-        tile_y = tile['pos'][1] * self.tile_size
-        
-        rect_data = {
-            0: (tile_x + (self.tile_size - spike_width) // 2,
-                tile_y + (self.tile_size - spike_height),
-                spike_width, spike_height),
-            90: (tile_x + (self.tile_size - spike_height),
-                tile_y + (self.tile_size - spike_width) // 2,
-                spike_height, spike_width),
-            180: (tile_x + (self.tile_size - spike_width) // 2,
-                tile_y, spike_width, spike_height),
-            270: (tile_x, tile_y + (self.tile_size - spike_width) // 2,
-                spike_height, spike_width)
-        }
-        
-        x, y, width, height = rect_data.get(rotation, rect_data[0])
-        return pygame.Rect(x, y, width, height)
+        return [pygame.Rect(box) for box in self.physics_boxes_around(pos)]
 
     def interactive_rects_around(self, pos):
-        tiles = []
-        for tile in self.tiles_around(pos):
-            if tile['type'] in INTERACTIVE_TILES:
-                match tile['type']:
-                    case 'finish':
-                        tiles.append((pygame.Rect(tile['pos'][0] * self.tile_size, tile['pos'][1] * self.tile_size, self.tile_size, self.tile_size), (tile['type'], tile['variant'])))
-                    case 'spikes':
-                        spike_rect = self.get_spike_rect_with_rotation(tile)
-                        tiles.append((spike_rect, (tile['type'], tile['variant'])))
-                    case 'kill':
-                        kill_rect = pygame.Rect(tile['pos'][0] * self.tile_size, tile['pos'][1] * self.tile_size, self.tile_size, self.tile_size)
-                        tiles.append((kill_rect, (tile['type'], tile['variant'])))
-        return tiles
-    
-    def is_below_map(self, entity_pos, tiles_threshold=2):
-        lowest_tile_y = self.lowest_y * self.tile_size
-        if entity_pos[1] > lowest_tile_y + (tiles_threshold * self.tile_size):
-            return True
-        return False
+        return [(pygame.Rect(box), tile_info) for box, tile_info in self.interactive_boxes_around(pos)]
 
     def render(self, surf, offset=(0, 0), zoom=10):
+        if self.overview is not None and self.tile_size < self.overview.min_tile_size:
+            self.overview.render(self, surf, offset)
+            return
+
+        visible = self.visible_chunks(offset, surf.get_size())
+
         # For offgrid tiles
-        for tile in self.offgrid_tiles:
-            if tile['type'] == 'spikes' and 'rotation' in tile:
-                img = self.game.get_rotated_image(tile['type'], tile['variant'], tile['rotation'])
-                x = tile['pos'][0] * self.tile_size - offset[0] - (img.get_width() - self.tile_size) // 2
-                y = tile['pos'][1] * self.tile_size - offset[1] - (img.get_height() - self.tile_size) // 2
-                surf.blit(img, (x, y))
-            else:
-                surf.blit(self.game.assets[tile['type']][tile['variant']], 
-                        (tile['pos'][0] * self.tile_size - offset[0], 
-                        tile['pos'][1] * self.tile_size - offset[1]))
-                    
+        offgrid = [self.offgrid_chunks[chunk] for chunk in visible if chunk in self.offgrid_chunks]
+        item = self.game.sprites.item
+        surf.blits([item(code, tile['pos'][0] * self.tile_size - offset[0], tile['pos'][1] * self.tile_size - offset[1])
+                    for _, code, tile in heapq.merge(*offgrid)], doreturn=False)
+
         # For grid tiles
-        for loc in self.tilemap:
-            tile = self.tilemap[loc]
-            if tile['type'] == 'spikes' and 'rotation' in tile:
-                img = self.game.get_rotated_image(tile['type'], tile['variant'], tile['rotation'])
-                x_pos = tile['pos'][0] * self.tile_size - offset[0] - (img.get_width() - self.tile_size) // 2
-                y_pos = tile['pos'][1] * self.tile_size - offset[1] - (img.get_height() - self.tile_size) // 2
-                surf.blit(img, (x_pos, y_pos))
+        if self.bake_chunks:
+            self.render_baked_chunks(surf, offset, visible)
+            return
+
+        surf.blits([entry for chunk in visible for entry in self.chunk_items(chunk, offset)], doreturn=False)
+
+    def chunk_items(self, chunk, offset):
+        # Surface.blits entries for the grid tiles of one chunk
+        item = self.game.sprites.item
+        cells = self.tilemap.cells
+        items = []
+        for key in self.chunks.get(chunk, ()):
+            x, y = unpack_key(key)
+            items.append(item(cells[key], x * self.tile_size - offset[0], y * self.tile_size - offset[1]))
+        return items
+
+    def bake_chunk(self, chunk):
+        chunk_span = CHUNK_SIZE * self.tile_size
+        chunk_surf = pygame.Surface((chunk_span, chunk_span))
+        chunk_surf.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+        origin = (chunk[0] * chunk_span, chunk[1] * chunk_span)
+        chunk_surf.blits(self.chunk_items(chunk, origin), doreturn=False)
+        return chunk_surf
+
+    def render_baked_chunks(self, surf, offset, visible):
+        if self.baked_tile_size != self.tile_size:
+            self.invalidate_chunks()
+
+        # A baked chunk is a full screen-depth surface (4.7 MB at 68 px tiles), so chunks are
+        # dropped as soon as they leave the screen and only as many as fit the budget are kept
+        visible_set = set(visible)
+        for chunk in [chunk for chunk in self.chunk_surfaces if chunk not in visible_set]:
+            del self.chunk_surfaces[chunk]
+        chunk_span = CHUNK_SIZE * self.tile_size
+        max_baked = BAKE_CACHE_BYTES // (chunk_span * chunk_span * 4)
+        for chunk in visible:
+            if chunk not in self.chunks:
+                continue
+            chunk_surf = self.chunk_surfaces.get(chunk)
+            if chunk_surf is None and len(self.chunk_surfaces) < max_baked:
+                chunk_surf = self.chunk_surfaces[chunk] = self.bake_chunk(chunk)
+            if chunk_surf is None:
+                surf.blits(self.chunk_items(chunk, offset), doreturn=False)
             else:
-                surf.blit(self.game.assets[tile['type']][tile['variant']], 
-                        (tile['pos'][0] * self.tile_size - offset[0], 
-                        tile['pos'][1] * self.tile_size - offset[1]))
-    
-    def get_background_map(self):
-        return self.map_background
-    
-    def set_background_map(self, map_path):
-        self.map_background = map_path
-        
\ No newline at end of file
+                surf.blit(chunk_surf, (chunk[0] * chunk_span - offset[0], chunk[1] * chunk_span - offset[1]))
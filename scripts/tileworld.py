@@ -0,0 +1,317 @@
+# tileworld.py
+import json
+from scripts.physics import SPIKE_SIZE, SAW_SIZE
+from scripts.collisionmesh import CollisionMesh, PHYSICS_TYPE_IDS, NEIGHBOR_OFFSETS
+from scripts.hazards import HazardIndex
+from scripts.mapformat import BINARY_EXTENSION, load_map, write_binary, binary_path, file_crc
+from scripts.tilegrid import (
+    TileGrid, TILE_TYPES, TYPE_MASK, type_id, pack_key, unpack_key, key_offset,
+    pack_tile, parse_loc, tile_dict, tile_type, tile_variant, tile_rotation
+)
+
+NEIGHBOR_KEYS = [(offset, key_offset(*offset)) for offset in NEIGHBOR_OFFSETS]
+CHUNK_SIZE = 16 # chunk width and height in tiles, used to cull rendering to the camera
+
+SPIKES_ID = type_id('spikes')
+
+def offgrid_cell(pos):
+    # The cell under the center of an off-grid tile
+    return (int((pos[0] + 0.5) // 1), int((pos[1] + 0.5) // 1))
+
+class TileWorld:
+    # Map storage, editing and collision queries without any pygame dependency.
+    # Boxes are (x, y, width, height) tuples in pixels; Tilemap wraps them in pygame Rects.
+    def __init__(self, tile_size=16):
+        self.tile_size = tile_size
+        self.tilemap = TileGrid()
+        self.offgrid_tiles = []
+        self.chunks = {}
+        self.offgrid_chunks = {}
+        self.offgrid_count = 0
+        self.collision_mesh = None # built on the first collision query
+        self.hazard_index = None # likewise, see get_hazard_index()
+        self.lowest_y = 0
+        self.map_background = None
+
+    def chunk_of(self, pos):
+        return (int(pos[0] // CHUNK_SIZE), int(pos[1] // CHUNK_SIZE))
+
+    def build_index(self):
+        self.chunks = {}
+        self.offgrid_chunks = {}
+        self.offgrid_count = 0
+        self.collision_mesh = None
+        self.hazard_index = None
+        for key in self.tilemap.cells:
+            self.chunks.setdefault(self.chunk_of(unpack_key(key)), set()).add(key)
+        for tile in self.offgrid_tiles:
+            self._index_offgrid_tile(tile)
+
+    def _index_offgrid_tile(self, tile):
+        # Off-grid tiles may overlap, so each entry keeps its list order for drawing, plus the
+        # packed code so the renderer never looks at the dict
+        entry = (self.offgrid_count, pack_tile(tile['type'], tile['variant'], tile.get('rotation')), tile)
+        self.offgrid_chunks.setdefault(self.chunk_of(tile['pos']), []).append(entry)
+        self.offgrid_count += 1
+
+    def tile_at(self, loc):
+        x, y = parse_loc(loc)
+        code = self.tilemap.code_at(x, y)
+        return tile_dict(x, y, code) if code else None
+
+    def add_tile(self, tile):
+        x, y = parse_loc(tile['pos'])
+        code = pack_tile(tile['type'], tile['variant'], tile.get('rotation'))
+        if self.tilemap.code_at(x, y) == code:
+            return
+        self.tilemap.set_code(x, y, code)
+        chunk = self.chunk_of((x, y))
+        self.chunks.setdefault(chunk, set()).add(pack_key(x, y))
+        self.invalidate_chunk(chunk)
+        if self.collision_mesh is not None:
+            self.collision_mesh.update_chunk(chunk)
+        if self.hazard_index is not None:
+            self.hazard_index.update_tile(x, y)
+
+    def remove_tile(self, loc):
+        x, y = parse_loc(loc)
+        code = self.tilemap.discard(x, y)
+        chunk = self.chunk_of((x, y))
+        self.chunks[chunk].discard(pack_key(x, y))
+        if not self.chunks[chunk]:
+            del self.chunks[chunk]
+        self.invalidate_chunk(chunk)
+        if self.collision_mesh is not None:
+            self.collision_mesh.update_chunk(chunk)
+        if self.hazard_index is not None:
+            self.hazard_index.update_tile(x, y)
+        return tile_dict(x, y, code)
+
+    # Hooks for subclasses that cache per-chunk data
+    def invalidate_chunk(self, chunk):
+        pass
+
+    def invalidate_chunks(self):
+        pass
+
+    def add_offgrid_tile(self, tile):
+        self.offgrid_tiles.append(tile)
+        self._index_offgrid_tile(tile)
+        if self.hazard_index is not None:
+            self.hazard_index.update_offgrid(self.hazard_index.add_offgrid(tile))
+
+    def remove_offgrid_tile(self, tile):
+        self.offgrid_tiles = [entry for entry in self.offgrid_tiles if entry is not tile]
+        chunk = self.chunk_of(tile['pos'])
+        self.offgrid_chunks[chunk] = [entry for entry in self.offgrid_chunks[chunk] if entry[2] is not tile]
+        if not self.offgrid_chunks[chunk]:
+            del self.offgrid_chunks[chunk]
+        if self.hazard_index is not None:
+            self.hazard_index.update_offgrid(self.hazard_index.remove_offgrid(tile))
+
+    def offgrid_near(self, x, y):
+        # Off-grid tiles positioned within a tile of (x, y) in tile units, from the chunks
+        # around it rather than the whole list. Off-grid tiles are at most a tile in size, so
+        # this covers every tile whose image contains the point.
+        chunks = {self.chunk_of((x + dx, y + dy)) for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+        near = []
+        for chunk in chunks:
+            for _, _, tile in self.offgrid_chunks.get(chunk, ()):
+                if abs(tile['pos'][0] - x) <= 1 and abs(tile['pos'][1] - y) <= 1:
+                    near.append(tile)
+        return near
+
+    def tile_types(self):
+        # TileGrid.codes has an entry per distinct code ever placed, so this is cheap on any map
+        types = {tile_type(code) for code in self.tilemap.codes}
+        types.update(tile['type'] for tile in self.offgrid_tiles)
+        return types
+
+    def codes_around(self, pos):
+        tile_x = int(pos[0] // self.tile_size)
+        tile_y = int(pos[1] // self.tile_size)
+        base_key = pack_key(tile_x, tile_y)
+        cells = self.tilemap.cells
+        codes = []
+        for offset, key_step in NEIGHBOR_KEYS:
+            code = cells.get(base_key + key_step)
+            if code:
+                codes.append((tile_x + offset[0], tile_y + offset[1], code))
+        return codes
+
+    def tiles_around(self, pos):
+        return [tile_dict(x, y, code) for x, y, code in self.codes_around(pos)]
+
+    def extract(self, id_pairs, keep=False):
+        matches = []
+        for tile in self.offgrid_tiles.copy():
+            if (tile['type'], tile['variant']) in id_pairs:
+                matches.append(tile.copy())
+                if not keep:
+                    self.remove_offgrid_tile(tile)
+
+        id_codes = {(type_id(tile_type), variant) for tile_type, variant in id_pairs}
+        for key, code in list(self.tilemap.cells.items()):
+            if (code & TYPE_MASK, tile_variant(code)) in id_codes:
+                x, y = unpack_key(key)
+                match = tile_dict(x, y, code)
+                match['pos'][0] *= self.tile_size
+                match['pos'][1] *= self.tile_size
+                matches.append(match)
+                if not keep:
+                    self.remove_tile((x, y))
+
+        return matches
+
+    def save(self, path):
+        lowest_y = 0
+        for _, y, _ in self.tilemap.iter_codes():
+            lowest_y = max(lowest_y, y)
+
+        spawner_tiles = self.extract([('spawners', 0), ('spawners', 1)], keep=True)
+        if len(spawner_tiles) > 1:
+            self.extract([('spawners', 0), ('spawners', 1)], keep=False)
+            spawner = spawner_tiles[0]
+            if 'pos' in spawner:
+                pos = spawner['pos'].copy()
+                if len(str(pos[0]).split('.')) == 1:
+                    pos[0] = pos[0] // self.tile_size
+                    pos[1] = pos[1] // self.tile_size
+
+                self.add_tile({
+                    'type': spawner['type'],
+                    'variant': spawner['variant'],
+                    'pos': [int(pos[0]), int(pos[1])]
+                })
+
+        map_data = {
+            'tilemap': self.tilemap,
+            'offgrid': self.offgrid_tiles,
+            'lowest_y': lowest_y,
+            'map': self.map_background
+        }
+        if path.endswith(BINARY_EXTENSION):
+            write_binary(path, map_data)
+            return
+
+        f = open(path, 'w')
+        json.dump(dict(map_data, tilemap=dict(self.tilemap)), f, indent=4)
+        f.close()
+        write_binary(binary_path(path), map_data, file_crc(path))
+
+    def load(self, path):
+        map_data = load_map(path)
+        self.tilemap = map_data['tilemap']
+        self.offgrid_tiles = map_data['offgrid']
+        self.lowest_y = map_data.get('lowest_y', 0)
+        self.map_background = map_data.get('map', None)
+        self.build_index()
+        self.invalidate_chunks()
+
+        spawner_tiles = self.extract([('spawners', 0), ('spawners', 1)], keep=True)
+        if len(spawner_tiles) > 1:
+            self.extract([('spawners', 0), ('spawners', 1)], keep=False)
+            spawner = spawner_tiles[0]
+            if 'pos' in spawner:
+                pos = spawner['pos'].copy()
+                if len(str(pos[0]).split('.')) == 1:
+                    pos[0] = pos[0] // self.tile_size
+                    pos[1] = pos[1] // self.tile_size
+
+                self.add_tile({
+                    'type': spawner['type'],
+                    'variant': spawner['variant'],
+                    'pos': [int(pos[0]), int(pos[1])]
+                })
+
+    def cell_key(self, pos):
+        # Key of the tile cell pos is in; the *_at(key) queries below take it, so a caller
+        # that stays in one cell can reuse a query instead of repeating it
+        return pack_key(int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
+
+    def get_collision_mesh(self):
+        if self.collision_mesh is None or self.collision_mesh.tile_size != self.tile_size:
+            self.collision_mesh = CollisionMesh(self, CHUNK_SIZE)
+        return self.collision_mesh
+
+    def physics_boxes_at(self, key):
+        return self.get_collision_mesh().boxes_around(key)
+
+    def physics_boxes_in(self, area):
+        return self.get_collision_mesh().boxes_in(area)
+
+    def physics_boxes_around(self, pos):
+        # Merged solid boxes touching the 3x3 tiles around pos, as a shared tuple
+        return self.physics_boxes_at(self.cell_key(pos))
+
+    def spike_box(self, x, y, rotation):
+        spike_width = int(self.tile_size * SPIKE_SIZE[0])
+        spike_height = int(self.tile_size * SPIKE_SIZE[1])
+
+        tile_x = x * self.tile_size
+        tile_y = y * self.tile_size
+
+        if rotation == 90:
+            return (tile_x + (self.tile_size - spike_height), tile_y + (self.tile_size - spike_width) // 2,
+                    spike_height, spike_width)
+        if rotation == 180:
+            return (tile_x + (self.tile_size - spike_width) // 2, tile_y, spike_width, spike_height)
+        if rotation == 270:
+            return (tile_x, tile_y + (self.tile_size - spike_width) // 2, spike_height, spike_width)
+        return (tile_x + (self.tile_size - spike_width) // 2, tile_y + (self.tile_size - spike_height),
+                spike_width, spike_height)
+
+    def interactive_box(self, x, y, code):
+        # Hitbox and (type, variant) of an interactive grid tile, or None for types without one
+        tile_info = (TILE_TYPES[code & TYPE_MASK], tile_variant(code))
+        match tile_info[0]:
+            case 'finish' | 'kill':
+                return (x * self.tile_size, y * self.tile_size, self.tile_size, self.tile_size), tile_info
+            case 'spikes':
+                return self.spike_box(x, y, tile_rotation(code) or 0), tile_info
+        return None
+
+    def offgrid_hazard(self, tile):
+        # Off-grid spikes, saws and kill tiles hurt like grid ones. Off-grid finish tiles stay
+        # decoration: the bundled maps place them around the real (grid) finish.
+        x, y = tile['pos']
+        ts = self.tile_size
+        tile_info = (tile['type'], tile['variant'])
+        match tile['type']:
+            case 'kill':
+                box = (int(x * ts), int(y * ts), ts, ts)
+            case 'spikes':
+                box = tuple(int(v) for v in self.spike_box(x, y, tile.get('rotation') or 0))
+            case 'saws':
+                size = int(ts * SAW_SIZE)
+                box = (int(x * ts) + (ts - size) // 2, int(y * ts) + (ts - size) // 2, size, size)
+            case _:
+                return None
+        return box, tile_info
+
+    def get_hazard_index(self):
+        if self.hazard_index is None or self.hazard_index.tile_size != self.tile_size:
+            self.hazard_index = HazardIndex(self)
+        return self.hazard_index
+
+    def interactive_boxes_at(self, key):
+        return self.get_hazard_index().hazards_around(key)
+
+    def interactive_boxes_in(self, areas):
+        return self.get_hazard_index().hazards_in(areas)
+
+    def interactive_boxes_around(self, pos):
+        # (box, (type, variant)) of the interactive tiles around pos, as a shared tuple
+        return self.interactive_boxes_at(self.cell_key(pos))
+
+    def is_below_map(self, entity_pos, tiles_threshold=2):
+        lowest_tile_y = self.lowest_y * self.tile_size
+        if entity_pos[1] > lowest_tile_y + (tiles_threshold * self.tile_size):
+            return True
+        return False
+
+    def get_background_map(self):
+        return self.map_background
+
+    def set_background_map(self, map_path):
+        self.map_background = map_path
@@ -1,31 +1,17 @@
 import os
 import pygame
 from scripts.constants import *
-
-BASE_IMG_PATH = 'data/images/'
+from scripts.assets import asset_manager, BASE_IMG_PATH
+from scripts.tilegrid import tile_rotation
 
 def load_image(path, scale = None, remove_color = (0, 0, 0)):
-    img = pygame.image.load(BASE_IMG_PATH + path).convert()
-    if remove_color is not None: img.set_colorkey(remove_color)
-    if scale is not None:
-        img = pygame.transform.scale(img, scale)
-    return img
+    return asset_manager.image(path, scale, remove_color)
 
 def load_sounds(path, volume=0.05):  
-    sounds = []
-    full_path = 'data/sfx/' + path
-    for snd_name in sorted(os.listdir(full_path)):
-        if snd_name.endswith('.mp3'):
-            sound = pygame.mixer.Sound(os.path.join(full_path, snd_name))
-            sound.set_volume(volume)  # Set the volume here
-            sounds.append(sound)
-    return sounds
+    return asset_manager.sound_list(path, volume)
 
 def load_images(path, scale = None, remove_color = (0, 0, 0)):
-    images = []
-    for img_name in sorted(os.listdir(BASE_IMG_PATH + path)):
-        images.append(load_image(path + '/' + img_name, scale, remove_color))
-    return images
+    return asset_manager.images(path, scale, remove_color)
 
 def find_next_numeric_filename(directory, extension='.json'):
     existing_files = os.listdir(directory)
@@ -91,43 +77,40 @@ def draw_debug_info(game, surface, offset):
     visible_end_y = (offset[1] + surface.get_height()) // game.tilemap.tile_size + 1
     
     # Limit debug drawing to visible spikes only
+    hazards = game.tilemap.get_hazard_index()
     for x in range(visible_start_x, visible_end_x):
         for y in range(visible_start_y, visible_end_y):
-            loc = f"{x};{y}"
-            if loc in game.tilemap.tilemap:
-                tile = game.tilemap.tilemap[loc]
-                if tile['type'] == 'spikes':
-                    # Draw tile outline
-                    pygame.draw.rect(
-                        surface,
-                        (255, 192, 203),
-                        (tile['pos'][0] * game.tilemap.tile_size - offset[0],
-                         tile['pos'][1] * game.tilemap.tile_size - offset[1],
-                         game.tilemap.tile_size, game.tilemap.tile_size),
-                        1
-                    )
-                    
-                    # Get spike rect
-                    spike_rect = game.tilemap.get_spike_rect_with_rotation(tile)
-                    
-                    # Draw spike hitbox
-                    pygame.draw.rect(
-                        surface,
-                        (255, 255, 0),
-                        (spike_rect.x - offset[0], spike_rect.y - offset[1],
-                         spike_rect.width, spike_rect.height),
-                        2
-                    )
-                    
-                    # Show rotation value (only if really needed)
-                    if game.show_rotation_values:  # Add this flag to your game class
-                        rotation = tile.get('rotation', 0)
-                        debug_font = pygame.font.Font(FONT, 10)
-                        rotation_text = debug_font.render(f"{rotation}°", True, (255, 255, 255))
-                        surface.blit(rotation_text, (
-                            tile['pos'][0] * game.tilemap.tile_size - offset[0] + 2,
-                            tile['pos'][1] * game.tilemap.tile_size - offset[1] + 2
-                        ))
+            hazard = hazards.hazard_at(x, y)
+            if hazard and hazard[1][0] == 'spikes':
+                # Draw tile outline
+                pygame.draw.rect(
+                    surface,
+                    (255, 192, 203),
+                    (x * game.tilemap.tile_size - offset[0],
+                     y * game.tilemap.tile_size - offset[1],
+                     game.tilemap.tile_size, game.tilemap.tile_size),
+                    1
+                )
+
+                # Draw spike hitbox
+                spike_box = hazard[0]
+                pygame.draw.rect(
+                    surface,
+                    (255, 255, 0),
+                    (spike_box[0] - offset[0], spike_box[1] - offset[1],
+                     spike_box[2], spike_box[3]),
+                    2
+                )
+
+                # Show rotation value (only if really needed)
+                if game.show_rotation_values:  # Add this flag to your game class
+                    rotation = tile_rotation(game.tilemap.tilemap.code_at(x, y)) or 0
+                    debug_font = pygame.font.Font(FONT, 10)
+                    rotation_text = debug_font.render(f"{rotation}°", True, (255, 255, 255))
+                    surface.blit(rotation_text, (
+                        x * game.tilemap.tile_size - offset[0] + 2,
+                        y * game.tilemap.tile_size - offset[1] + 2
+                    ))
     
     # Draw interactive rects around player (limit to a smaller area)
     player_pos = game.player.pos
@@ -157,7 +140,14 @@ def draw_debug_info(game, surface, offset):
     debug_font = pygame.font.Font(FONT, 20)
     debug_text = debug_font.render("Debug: Hitboxes Visible", True, (0, 255, 0))
     surface.blit(debug_text, (10, 80))
+    peak, net = game.player.step_memory
+    memory_text = debug_font.render(f"Step alloc: {peak} B peak, {net} B net", True, (0, 255, 0))
+    surface.blit(memory_text, (10, 105))
+
 
+def lerp(a, b, t):
+    # Written so t == 1 gives exactly b
+    return b - (b - a) * (1 - t)
 
 def update_camera_with_box(player, scroll, display_width, display_height):
     box_width = 200
@@ -189,15 +179,17 @@ def update_camera_with_box(player, scroll, display_width, display_height):
     
     return scroll
 class Animation:
-    def __init__(self, images, img_dur=5, loop=True):
+    def __init__(self, images, img_dur=5, loop=True, flipped=None):
         self.images = images
+        # Mirrored frames are built once and shared by every copy of the animation
+        self.flipped = flipped if flipped is not None else [pygame.transform.flip(img, True, False) for img in images]
         self.loop = loop
         self.img_duration = img_dur
         self.done = False
         self.frame = 0
     
     def copy(self):
-        return Animation(self.images, self.img_duration, self.loop)
+        return Animation(self.images, self.img_duration, self.loop, self.flipped)
     
     def update(self):
         if self.loop:
@@ -207,8 +199,8 @@ class Animation:
             if self.frame >= self.img_duration * len(self.images) - 1:
                 self.done = True
     
-    def img(self):
-        return self.images[int(self.frame / self.img_duration)]
+    def img(self, flip=False):
+        return (self.flipped if flip else self.images)[int(self.frame / self.img_duration)]
 
 class Button:
     def __init__(self, rect, text, action, font, menu, bg_color=None):
@@ -0,0 +1,10 @@
+# The game loads maps and images by paths relative to the repo root, so tests run from there
+# whatever directory pytest was started in, and without a display or sound card.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
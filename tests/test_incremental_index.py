@@ -0,0 +1,54 @@
+import random
+import pytest
+from scripts.collisionmesh import CollisionMesh, PHYSICS_TYPE_IDS
+from scripts.hazards import HazardIndex
+from scripts.simulation import load_level
+from scripts.tileworld import CHUNK_SIZE
+from scripts.tilegrid import TYPE_MASK, unpack_key
+
+TILE_SIZE = 36
+MAPS = [0, 3, 9, 11]
+EDITS = 400
+
+def edit_randomly(world, rng):
+    # Places and erases grid and off-grid tiles around existing ones, the way the editor does
+    keys = list(world.tilemap.cells)
+    placed = []
+    for _ in range(EDITS):
+        x, y = unpack_key(rng.choice(keys))
+        x += rng.randint(-3, 3)
+        y += rng.randint(-3, 3)
+        roll = rng.random()
+        if roll < 0.4:
+            world.add_tile({'type': rng.choice(['stone', 'grass', 'decor', 'spikes', 'kill', 'finish']), 'variant': 0,
+                            'pos': (x, y), 'rotation': rng.choice([0, 90, 180, 270])})
+        elif roll < 0.7:
+            if world.tilemap.code_at(x, y):
+                world.remove_tile((x, y))
+        elif roll < 0.9 or not placed:
+            tile = {'type': rng.choice(['spikes', 'kill', 'decor']), 'variant': 0,
+                    'pos': [x + rng.random(), y + rng.random()], 'rotation': rng.choice([0, 90, 180, 270])}
+            world.add_offgrid_tile(tile)
+            placed.append(tile)
+        else:
+            world.remove_offgrid_tile(placed.pop(rng.randrange(len(placed))))
+
+@pytest.mark.parametrize('map_id', MAPS)
+def test_incremental_updates_match_a_rebuild(map_id):
+    world, _ = load_level(f'data/maps/{map_id}.json', TILE_SIZE)
+    # Build both indexes first so every edit below goes through their incremental paths
+    mesh = world.get_collision_mesh()
+    hazards = world.get_hazard_index()
+    edit_randomly(world, random.Random(map_id))
+    assert world.collision_mesh is mesh and world.hazard_index is hazards
+
+    rebuilt_mesh = CollisionMesh(world, CHUNK_SIZE)
+    assert mesh.owner == rebuilt_mesh.owner
+    assert mesh.around == rebuilt_mesh.around
+    solid = {key for key, code in world.tilemap.cells.items() if (code & TYPE_MASK) in PHYSICS_TYPE_IDS}
+    assert set(mesh.owner) == solid
+
+    rebuilt_hazards = HazardIndex(world)
+    assert hazards.hazards == rebuilt_hazards.hazards
+    assert hazards.offgrid == rebuilt_hazards.offgrid
+    assert hazards.around == rebuilt_hazards.around
@@ -0,0 +1,60 @@
+import glob
+import json
+import os
+import pytest
+from scripts.mapformat import write_binary, read_binary, load_map, binary_path
+from scripts.tilegrid import TileGrid
+
+MAP_PATHS = sorted(glob.glob(os.path.join('data', 'maps', '*.json')))
+
+def grid_tiles(grid):
+    return {loc: (tile['type'], tile['variant'], tile.get('rotation', 0)) for loc, tile in TileGrid(grid).items()}
+
+def offgrid_tiles(offgrid):
+    return [(tile['type'], tile['variant'], tuple(tile['pos']), tile.get('rotation', 0)) for tile in offgrid]
+
+def assert_same_map(loaded, source):
+    assert grid_tiles(loaded['tilemap']) == grid_tiles(source['tilemap'])
+    assert offgrid_tiles(loaded['offgrid']) == offgrid_tiles(source['offgrid'])
+    assert loaded['lowest_y'] == source.get('lowest_y', 0)
+    assert loaded['map'] == source.get('map')
+
+@pytest.mark.parametrize('map_path', MAP_PATHS)
+def test_shipped_maps_round_trip(map_path, tmp_path):
+    with open(map_path) as f:
+        source = json.load(f)
+    path = str(tmp_path / 'map.tmap')
+    write_binary(path, source)
+    assert_same_map(read_binary(path), source)
+
+def test_round_trip_keeps_negative_cells_rotations_and_offgrid(tmp_path):
+    source = {
+        'tilemap': {
+            '-3;-7': {'type': 'stone', 'variant': 2, 'pos': [-3, -7]},
+            '0;0': {'type': 'spikes', 'variant': 0, 'pos': [0, 0], 'rotation': 270},
+            '40000;5': {'type': 'wool', 'variant': 1, 'pos': [40000, 5]},
+        },
+        'offgrid': [
+            {'type': 'decor', 'variant': 3, 'pos': [1.25, -2.5]},
+            {'type': 'spikes', 'variant': 0, 'pos': [4.5, 6.0], 'rotation': 90},
+        ],
+        'lowest_y': 5,
+        'map': 'data/images/background/background.png',
+    }
+    path = str(tmp_path / 'map.tmap')
+    write_binary(path, source)
+    assert_same_map(read_binary(path), source)
+
+def test_stale_binary_sibling_is_rebuilt(tmp_path):
+    source = {'tilemap': {'1;1': {'type': 'stone', 'variant': 0, 'pos': [1, 1]}}, 'offgrid': [], 'lowest_y': 1, 'map': None}
+    json_path = str(tmp_path / 'map.json')
+    with open(json_path, 'w') as f:
+        json.dump(source, f)
+    assert_same_map(load_map(json_path), source)
+    assert os.path.exists(binary_path(json_path))
+
+    source['tilemap']['2;1'] = {'type': 'grass', 'variant': 1, 'pos': [2, 1]}
+    with open(json_path, 'w') as f:
+        json.dump(source, f)
+    assert_same_map(load_map(json_path), source)
+    assert_same_map(read_binary(binary_path(json_path)), source)
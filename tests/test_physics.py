@@ -0,0 +1,208 @@
+import json
+import random
+import pygame
+import pytest
+from scripts.physics import (
+    PLAYER_BUFFER, COYOTE_TIME, WALL_MOMENTUM_PRESERVE, WALL_MOMENTUM_FRAMES, PHYSICS_TILES, SPIKE_SIZE, PhysicsConstants
+)
+from scripts.simulation import PlayerBody, load_level, player_size, DEATH_FRAMES
+
+TILE_SIZE = 36
+MAPS = [0, 3, 5, 8, 9, 11]
+TICKS = 1500
+
+NEIGHBOR_OFFSETS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (0, 0), (-1, 1), (0, 1), (1, 1)]
+
+class BaselinePlayer:
+    # Player.update and the Tilemap queries it used before the simulation core existed, reading
+    # the map JSON directly. Animation and sound are left out, they don't affect movement.
+    def __init__(self, map_data, pos, size, physics):
+        self.tilemap = map_data['tilemap']
+        self.lowest_y = map_data.get('lowest_y', 0)
+        self.start_pos = pos
+        self.size = size
+        self.physics = physics
+        self.reset()
+
+    def reset(self):
+        self.pos = list(self.start_pos)
+        self.velocity = [0, 0]
+        self.collisions = {'up': False, 'down': False, 'right': False, 'left': False}
+        self.air_time = 5
+        self.grounded = False
+        self.jump_available = True
+        self.coyote_time = 0
+        self.death = False
+        self.finishLevel = False
+        self.was_colliding_wall = False
+        self.wall_contact_time = 0
+        self.wall_momentum_active = False
+
+    def rect(self):
+        return pygame.Rect(self.pos[0], self.pos[1], self.size[0], self.size[1])
+
+    def tiles_around(self, pos):
+        tile_loc = (int(pos[0] // TILE_SIZE), int(pos[1] // TILE_SIZE))
+        locs = [f"{tile_loc[0] + dx};{tile_loc[1] + dy}" for dx, dy in NEIGHBOR_OFFSETS]
+        return [self.tilemap[loc] for loc in locs if loc in self.tilemap]
+
+    def physics_rects_around(self, pos):
+        return [pygame.Rect(tile['pos'][0] * TILE_SIZE, tile['pos'][1] * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+                for tile in self.tiles_around(pos) if tile['type'] in PHYSICS_TILES]
+
+    def spike_rect(self, tile):
+        spike_width = int(TILE_SIZE * SPIKE_SIZE[0])
+        spike_height = int(TILE_SIZE * SPIKE_SIZE[1])
+        tile_x = tile['pos'][0] * TILE_SIZE
+        tile_y = tile['pos'][1] * TILE_SIZE
+        rect_data = {
+            0: (tile_x + (TILE_SIZE - spike_width) // 2, tile_y + (TILE_SIZE - spike_height), spike_width, spike_height),
+            90: (tile_x + (TILE_SIZE - spike_height), tile_y + (TILE_SIZE - spike_width) // 2, spike_height, spike_width),
+            180: (tile_x + (TILE_SIZE - spike_width) // 2, tile_y, spike_width, spike_height),
+            270: (tile_x, tile_y + (TILE_SIZE - spike_width) // 2, spike_height, spike_width),
+        }
+        return pygame.Rect(rect_data.get(tile.get('rotation', 0), rect_data[0]))
+
+    def interactive_rects_around(self, pos):
+        rects = []
+        for tile in self.tiles_around(pos):
+            if tile['type'] in ('finish', 'kill'):
+                rects.append((pygame.Rect(tile['pos'][0] * TILE_SIZE, tile['pos'][1] * TILE_SIZE, TILE_SIZE, TILE_SIZE), tile['type']))
+            elif tile['type'] == 'spikes':
+                rects.append((self.spike_rect(tile), tile['type']))
+        return rects
+
+    def update(self, keys, jump_buffer, countdeathframes):
+        physics = self.physics
+        if self.pos[1] > self.lowest_y * TILE_SIZE + 2 * TILE_SIZE:
+            self.death = True
+            self.velocity = [0, 0]
+            return
+        if countdeathframes > DEATH_FRAMES or self.finishLevel:
+            return
+
+        self.collisions = {'up': False, 'down': False, 'right': False, 'left': False}
+        if not self.death:
+            self.velocity[0] += (int(keys['right']) - int(keys['left'])) * physics.player_speed
+            x_acceleration = (1 - physics.decceleration) if int(keys['right']) - int(keys['left']) == 0 else (1 - physics.acceleration)
+            self.velocity[0] = max(-physics.max_x_speed, min(physics.max_x_speed, self.velocity[0] * x_acceleration))
+            gravity = physics.gravity_down if self.velocity[1] > 0 and not keys['jump'] else physics.gravity_up
+            self.velocity[1] = max(-physics.max_y_speed, min(physics.max_y_speed, self.velocity[1] + gravity))
+        else:
+            self.velocity[0] = 0
+            self.velocity[1] = 0
+
+        self.pos[0] += self.velocity[0]
+        entity_rect = self.rect()
+        for rect in self.physics_rects_around(self.pos):
+            if entity_rect.colliderect(rect):
+                if self.velocity[0] > 0:
+                    entity_rect.right = rect.left
+                    self.collisions['right'] = True
+                if self.velocity[0] < 0:
+                    entity_rect.left = rect.right
+                    self.collisions['left'] = True
+                self.pos[0] = entity_rect.x
+
+        self.pos[1] += self.velocity[1]
+        entity_rect = self.rect()
+        for rect in self.physics_rects_around(self.pos):
+            if entity_rect.colliderect(rect):
+                if self.velocity[1] > 0:
+                    entity_rect.bottom = rect.top
+                    self.collisions['down'] = True
+                if self.velocity[1] < 0:
+                    entity_rect.top = rect.bottom
+                    self.collisions['up'] = True
+                self.pos[1] = entity_rect.y
+
+        entity_rect = self.rect()
+        for rect, tile_type in self.interactive_rects_around(self.pos):
+            if entity_rect.colliderect(rect):
+                if tile_type in ('spikes', 'kill'):
+                    self.death = True
+                    self.velocity = [0, 0]
+                    return
+                self.finishLevel = True
+
+        if self.collisions['right'] or self.collisions['left']:
+            self.velocity[0] = 0
+        if self.collisions['down'] or self.collisions['up']:
+            self.velocity[1] = 0
+
+        now_colliding_wall = self.collisions['left'] or self.collisions['right']
+        self.was_colliding_wall = now_colliding_wall
+
+        self.air_time += 1
+        was_grounded = self.grounded
+        if self.collisions['down']:
+            self.air_time = 0
+            self.coyote_time = 0
+        self.grounded = self.air_time <= 4
+        if was_grounded and not self.grounded:
+            self.coyote_time = 0
+        elif not self.grounded:
+            self.coyote_time += 1
+
+        if not keys['jump']:
+            self.jump_available = True
+        elif keys['jump'] and self.jump_available:
+            self.jump_available = False
+            if not self.grounded and (self.collisions['left'] or self.collisions['right']):
+                self.velocity[1] = -physics.walljump_y_speed
+                if self.collisions['right']: self.velocity[0] = -physics.walljump_x_speed
+                if self.collisions['left']: self.velocity[0] = physics.walljump_x_speed
+            elif (self.grounded or (self.coyote_time <= COYOTE_TIME and not self.grounded)) and jump_buffer <= PLAYER_BUFFER:
+                self.velocity[1] = -physics.jump_speed
+                self.air_time = 5
+                self.grounded = False
+                self.coyote_time = COYOTE_TIME + 1
+
+        if not self.grounded and (self.collisions['left'] or self.collisions['right']):
+            if not self.was_colliding_wall:
+                self.wall_contact_time = 0
+                if self.velocity[1] < 0:
+                    self.wall_momentum_active = True
+            self.wall_contact_time += 1
+            if self.wall_momentum_active and self.wall_contact_time <= WALL_MOMENTUM_FRAMES:
+                self.velocity[1] *= WALL_MOMENTUM_PRESERVE
+            else:
+                self.wall_momentum_active = False
+                if self.velocity[1] > 0:
+                    self.velocity[1] = min(physics.wallslide_speed, self.velocity[1])
+
+        if not keys['jump'] and self.velocity[1] < 0:
+            self.velocity[1] = 0
+
+def state(player):
+    return (player.pos[0], player.pos[1], player.velocity[0], player.velocity[1], dict(player.collisions),
+            player.grounded, player.death, player.finishLevel)
+
+@pytest.mark.parametrize('map_id', MAPS)
+def test_player_body_matches_baseline_update(map_id):
+    map_path = f'data/maps/{map_id}.json'
+    physics = PhysicsConstants(TILE_SIZE)
+    tilemap, spawn = load_level(map_path, TILE_SIZE)
+    with open(map_path) as f:
+        map_data = json.load(f)
+    body = PlayerBody(list(spawn), player_size(physics), physics)
+    baseline = BaselinePlayer(map_data, list(spawn), player_size(physics), physics)
+
+    rng = random.Random(map_id)
+    jump_buffer = countdeathframes = 0
+    for tick in range(TICKS):
+        if tick % 7 == 0:
+            roll = rng.random()
+            keys = {'left': roll < 0.15, 'right': roll > 0.3, 'jump': rng.random() < 0.35}
+        jump_buffer = min(jump_buffer + 1, PLAYER_BUFFER + 1) if keys['jump'] else 0
+        if body.death:
+            countdeathframes += 1
+        if countdeathframes >= DEATH_FRAMES or body.finishLevel:
+            # Respawn, the way Simulation does after a death and the level complete menu after a finish
+            for player in (body, baseline):
+                player.reset()
+                player.pos = list(spawn)
+            countdeathframes = 0
+        body.step(tilemap, keys, jump_buffer, countdeathframes)
+        baseline.update(keys, jump_buffer, countdeathframes)
+        assert state(body) == state(baseline), f"map {map_id} diverged at tick {tick}"
@@ -0,0 +1,66 @@
+import os
+import random
+import shutil
+import pytest
+from scripts import replay
+from scripts.replay import InputRecorder, read_replay, verify, write_replay, prune_replays, replay_folder, run_result
+from scripts.simulation import Simulation
+from scripts.physics import PLAYER_BUFFER
+
+TILE_SIZE = 36
+
+@pytest.fixture(autouse=True)
+def replay_folder_in_tmp(tmp_path, monkeypatch):
+    monkeypatch.setattr(replay, 'REPLAY_FOLDER', str(tmp_path / 'replays'))
+
+def record_run(map_path, ticks=600, seed=1):
+    # Plays random input through a Simulation while recording it, like Environment does
+    sim = Simulation(map_path, TILE_SIZE)
+    recorder = InputRecorder(TILE_SIZE)
+    recorder.start(map_path)
+    rng = random.Random(seed)
+    jump_buffer = 0
+    for tick in range(ticks):
+        if tick % 7 == 0:
+            roll = rng.random()
+            keys = {'left': roll < 0.15, 'right': roll > 0.3, 'jump': rng.random() < 0.35}
+        jump_buffer = min(jump_buffer + 1, PLAYER_BUFFER + 1) if keys['jump'] else 0
+        recorder.record(keys, jump_buffer)
+        sim.step(keys, jump_buffer)
+        if sim.player.finishLevel:
+            break
+    return recorder, run_result(sim)
+
+def test_recorded_run_verifies():
+    recorder, result = record_run('data/maps/3.json')
+    path = recorder.save(result)
+    info, inputs = read_replay(path)
+    assert len(inputs) == len(recorder.inputs) and info['result'] == result
+    assert verify(path) == []
+
+def test_verify_reports_a_wrong_result():
+    recorder, result = record_run('data/maps/3.json')
+    path = recorder.save(dict(result, ticks=result['ticks'] + 1))
+    assert verify(path) == [f"ticks is {result['ticks']}, recorded {result['ticks'] + 1}"]
+
+def test_verify_reports_a_changed_map(tmp_path):
+    map_path = str(tmp_path / '3.json')
+    shutil.copy('data/maps/3.json', map_path)
+    recorder, result = record_run(map_path)
+    path = recorder.save(result)
+    with open(map_path, 'a') as f:
+        f.write('\n')
+    assert verify(path) == ["map changed since recording"]
+
+def test_equal_length_runs_get_separate_files():
+    recorder, result = record_run('data/maps/3.json', ticks=50)
+    assert recorder.save(result) != recorder.save(result)
+
+def test_prune_keeps_one_replay_per_leaderboard_time():
+    map_path = 'data/maps/3.json'
+    for time in (3.0, 1.0, 2.0, 1.0, 5.0):
+        write_replay(os.path.join(replay_folder(map_path), replay.replay_name()), {'result': {'time': time}}, b'\0')
+    prune_replays(map_path, [1.0, 2.0, 3.0])
+    folder = replay_folder(map_path)
+    kept = sorted(read_replay(os.path.join(folder, name))[0]['result']['time'] for name in os.listdir(folder))
+    assert kept == [1.0, 2.0, 3.0]
@@ -0,0 +1,44 @@
+from scripts.physics import PhysicsConstants
+from scripts.simulation import PlayerBody, player_size, NO_KEYS
+from scripts.tileworld import TileWorld
+
+TILE_SIZE = 36
+
+def fast_physics():
+    # Fast enough that one step crosses several tiles, which only PlayerBody.sweep handles
+    physics = PhysicsConstants(TILE_SIZE)
+    physics.max_x_speed = physics.max_y_speed = 500
+    return physics
+
+def world(tiles):
+    tilemap = TileWorld(TILE_SIZE)
+    for tile in tiles:
+        tilemap.add_tile(tile)
+    tilemap.lowest_y = 100
+    return tilemap
+
+def dash_right(tilemap):
+    physics = fast_physics()
+    body = PlayerBody([0, 8], player_size(physics), physics)
+    body.velocity = [480, 0]
+    body.step(tilemap, NO_KEYS, 0)
+    return body
+
+def test_spike_before_finish_kills():
+    tilemap = world([{'type': 'spikes', 'variant': 0, 'pos': (5, 0)}, {'type': 'finish', 'variant': 0, 'pos': (9, 0)}])
+    body = dash_right(tilemap)
+    spike = tilemap.interactive_boxes_around((5 * TILE_SIZE, 0))[0][0]
+    assert body.death and not body.finishLevel
+    assert body.box()[0] + body.box()[2] == spike[0] # stopped where it touched the spike
+
+def test_finish_before_spike_finishes():
+    tilemap = world([{'type': 'finish', 'variant': 0, 'pos': (5, 0)}, {'type': 'spikes', 'variant': 0, 'pos': (9, 0)}])
+    body = dash_right(tilemap)
+    assert body.finishLevel and not body.death
+    assert body.box()[0] + body.box()[2] == 5 * TILE_SIZE
+
+def test_hazard_past_a_wall_is_not_reached():
+    tilemap = world([{'type': 'stone', 'variant': 0, 'pos': (4, 0)}, {'type': 'spikes', 'variant': 0, 'pos': (6, 0)}])
+    body = dash_right(tilemap)
+    assert not body.death and body.collisions['right']
+    assert body.box()[0] + body.box()[2] == 4 * TILE_SIZE